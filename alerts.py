@@ -0,0 +1,115 @@
+import math
+from array import array
+from collections import namedtuple
+
+ABOVE, BELOW, MOVE = range(3)
+UNKNOWN, DISARMED, ARMED = -1, 0, 1
+HYSTERESIS = 0.005  # a fired rule re-arms once the price backs off 0.5% from its threshold
+
+Alert = namedtuple('Alert', 'ticker kind threshold window value')
+
+
+def alert_text(alert):
+    name = alert.ticker.capitalize()
+    if alert.kind == ABOVE:
+        return f"{name} rose above ${alert.threshold:,.2f} (now ${alert.value:,.2f})"
+    if alert.kind == BELOW:
+        return f"{name} fell below ${alert.threshold:,.2f} (now ${alert.value:,.2f})"
+    arrow = "↑" if alert.value >= 0 else "↓"
+    return f"{name} moved {arrow} {abs(alert.value):.2f}% in {alert.window / 60:.0f} min"
+
+
+def favorite_rules(favorites):
+    # (ticker, kind, threshold, window) for every alert configured on the favorites
+    rules = []
+    for ticker, data in favorites.items():
+        if data.get('low_threshold') is not None:
+            rules.append((ticker, BELOW, data['low_threshold'], 0))
+        if data.get('high_threshold') is not None:
+            rules.append((ticker, ABOVE, data['high_threshold'], 0))
+        if data.get('move_percent'):
+            rules.append((ticker, MOVE, data['move_percent'], data.get('move_window', 60) * 60))
+    return rules
+
+
+class AlertEngine:
+    # rules live in parallel columns and are evaluated together in one pass per price update;
+    # each rule fires on crossing its threshold and re-arms only after moving back past the
+    # hysteresis band, so a price hovering around a threshold doesn't notify on every tick
+    def __init__(self, hysteresis=HYSTERESIS):
+        self.hysteresis = hysteresis
+        self.tickers = []
+        self.rule_ticker = array('i')
+        self.kind = array('b')
+        self.threshold = array('d')
+        self.window = array('d')
+        self.state = array('b')
+
+    def __len__(self):
+        return len(self.kind)
+
+    def rule(self, i):
+        return (self.tickers[self.rule_ticker[i]], self.kind[i], self.threshold[i], self.window[i])
+
+    def set_rules(self, rules):
+        # unchanged rules keep their armed state, so editing one favorite doesn't re-fire the rest
+        states = {self.rule(i): self.state[i] for i in range(len(self))}
+        slots = {}
+        self.tickers = []
+        self.rule_ticker = array('i')
+        self.kind = array('b')
+        self.threshold = array('d')
+        self.window = array('d')
+        self.state = array('b')
+        for ticker, kind, threshold, window in rules:
+            if ticker not in slots:
+                slots[ticker] = len(self.tickers)
+                self.tickers.append(ticker)
+            self.rule_ticker.append(slots[ticker])
+            self.kind.append(kind)
+            self.threshold.append(threshold)
+            self.window.append(window)
+            self.state.append(states.get((ticker, kind, float(threshold), float(window)), UNKNOWN))
+
+    def evaluate(self, prices, history=None):
+        values = array('d', (prices.get(ticker, math.nan) for ticker in self.tickers))
+        changes = {}
+        rearm_below = 1 - self.hysteresis
+        rearm_above = 1 + self.hysteresis
+        rule_ticker, kinds, thresholds, windows, states = self.rule_ticker, self.kind, self.threshold, self.window, self.state
+        fired = []
+        for i in range(len(kinds)):
+            slot = rule_ticker[i]
+            value = values[slot]
+            if value != value:
+                continue
+            kind = kinds[i]
+            threshold = thresholds[i]
+            if kind == ABOVE:
+                hit = value >= threshold
+                clear = value < threshold * rearm_below
+            elif kind == BELOW:
+                hit = value <= threshold
+                clear = value > threshold * rearm_above
+            else:
+                key = (slot, windows[i])
+                if key not in changes:
+                    changes[key] = history.percent_change(self.tickers[slot], windows[i]) if history else None
+                value = changes[key]
+                if value is None:
+                    continue
+                hit = abs(value) >= threshold
+                clear = abs(value) < threshold * rearm_below
+
+            state = states[i]
+            if state == ARMED:
+                if hit:
+                    states[i] = DISARMED
+                    fired.append(Alert(self.tickers[slot], kind, threshold, windows[i], value))
+            elif state == DISARMED:
+                if clear:
+                    states[i] = ARMED
+            else:
+                # first sighting: only a later crossing counts, not where the price already is
+                states[i] = DISARMED if hit else ARMED
+        return fired
@@ -0,0 +1,55 @@
+import argparse
+import json
+import sys
+
+# every measurement is a cost, so bigger is worse; these are sizes and settings of the
+# run rather than measurements, shown but never flagged
+NOT_MEASURED = ('count', 'renders', 'polls', 'simulated_days', 'stall_threshold_ms', 'rate_limit_per_minute',
+                'budget_per_minute', 'total', 'ok', 'failed', 'rate_limited')
+
+
+def flatten(results, prefix=''):
+    values = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            values.update(flatten(value, name + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[name] = value
+    return values
+
+
+def compare(before, after, threshold):
+    # (name, before, after, percent change, regressed)
+    old = flatten(before['results'])
+    new = flatten(after['results'])
+    rows = []
+    for name in sorted(old.keys() & new.keys()):
+        if old[name] == 0:
+            change = 0.0 if new[name] == 0 else float('inf')
+        else:
+            change = (new[name] - old[name]) / abs(old[name]) * 100
+        measured = name.rsplit('.', 1)[-1] not in NOT_MEASURED and '.by_status.' not in name
+        rows.append((name, old[name], new[name], change, measured and change > threshold))
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare two run_bench.py reports")
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=10, help="percent worse that counts as a regression")
+    args = parser.parse_args()
+    with open(args.before, 'r') as f:
+        before = json.load(f)
+    with open(args.after, 'r') as f:
+        after = json.load(f)
+    print(f"{before.get('version')} ({before.get('commit')}) -> {after.get('version')} ({after.get('commit')})")
+    if before.get('config') != after.get('config'):
+        print("warning: the two runs used different settings, differences may not be regressions")
+    rows = compare(before, after, args.threshold)
+    for name, old, new, change, regressed in rows:
+        print(f"{'!' if regressed else ' '} {name:<45} {old:>14.4g} {new:>14.4g} {change:>+9.1f}%")
+    regressions = sum(1 for row in rows if row[4])
+    print(f"{regressions} regression(s) over {args.threshold:g}%")
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,147 @@
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+RECORDING = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'recordings', 'coingecko.json')
+COINGECKO_API = "https://api.coingecko.com/api/v3"
+
+
+class MockCoinGecko(ThreadingHTTPServer):
+    # replays recorded /simple/price, /coins/markets and /coins/list answers in order,
+    # with optional latency, failures and 429s, and keeps a log of what was asked
+    daemon_threads = True
+
+    def __init__(self, recording=RECORDING, port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                 throttle_rate=0.0, retry_after=5, seed=None):
+        super().__init__(('127.0.0.1', port), MockHandler)
+        with open(recording, 'r') as f:
+            self.recording = json.load(f)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.positions = {}
+        self.log = []  # (monotonic time, status) per answer
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/api/v3"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def next_recorded(self, name):
+        with self.lock:
+            answers = self.recording[name]
+            position = self.positions.get(name, 0)
+            self.positions[name] = position + 1
+        return answers[position % len(answers)]
+
+    def answer(self, path, query):
+        # (status, headers, body)
+        with self.lock:
+            roll = self.random.random()
+            delay = max(self.latency + self.random.uniform(-self.jitter, self.jitter), 0.0)
+        time.sleep(delay)
+        if roll < self.throttle_rate:
+            return 429, {'Retry-After': str(self.retry_after)}, {'status': {'error_code': 429}}
+        if roll < self.throttle_rate + self.error_rate:
+            return 503, {}, {'error': "injected failure"}
+        if path.endswith('/simple/price'):
+            snapshot = self.next_recorded('simple_price')
+            ids = query.get('ids', [''])[0].split(',')
+            currencies = query.get('vs_currencies', ['usd'])[0].split(',')
+            return 200, {}, {ticker: {currency: snapshot[ticker][currency] for currency in currencies if currency in snapshot[ticker]}
+                             for ticker in ids if ticker in snapshot}
+        if path.endswith('/coins/markets'):
+            page = int(query.get('page', ['1'])[0])
+            return 200, {}, self.next_recorded('coins_markets') if page == 1 else []
+        if path.endswith('/coins/list'):
+            return 200, {}, self.recording['coins_list']
+        return 404, {}, {'error': "not recorded"}
+
+    def record(self, status):
+        with self.lock:
+            self.log.append((time.monotonic(), status))
+
+    def requests_between(self, start, end):
+        with self.lock:
+            return [entry for entry in self.log if start <= entry[0] < end]
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        status, headers, body = self.server.answer(url.path, parse_qs(url.query))
+        content = json.dumps(body, separators=(',', ':')).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+        self.server.record(status)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def record(path, tickers, samples, interval):
+    # capture real answers to replay later; mind the free API's rate limit when choosing samples
+    import requests
+    recording = {'simple_price': [], 'coins_markets': [], 'coins_list': []}
+    session = requests.Session()
+    for sample in range(samples):
+        response = session.get(f"{COINGECKO_API}/simple/price",
+                               params={'ids': ','.join(tickers), 'vs_currencies': 'usd,eur,gbp,btc,eth'}, timeout=10)
+        response.raise_for_status()
+        recording['simple_price'].append(response.json())
+        print(f"recorded sample {sample + 1}/{samples}", file=sys.stderr)
+        if sample + 1 < samples:
+            time.sleep(interval)
+    response = session.get(f"{COINGECKO_API}/coins/markets",
+                           params={'vs_currency': 'usd', 'order': 'market_cap_desc', 'per_page': 250, 'page': 1,
+                                   'price_change_percentage': '1h,24h,7d'}, timeout=10)
+    response.raise_for_status()
+    recording['coins_markets'].append(response.json())
+    recording['coins_list'] = [{'id': coin['id'], 'symbol': coin['symbol'], 'name': coin['name']}
+                               for coin in recording['coins_markets'][0]]
+    with open(path, 'w') as f:
+        json.dump(recording, f, separators=(',', ':'))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve recorded CoinGecko answers, or record new ones")
+    parser.add_argument('--recording', default=RECORDING)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every answer")
+    parser.add_argument('--jitter', type=float, default=0.0, help="+/- seconds of random latency")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered 503")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="fraction of requests answered 429")
+    parser.add_argument('--record', action='store_true', help="record from the live API into --recording instead")
+    parser.add_argument('--tickers', default='bitcoin,ethereum,solana,dogecoin,shiba-inu')
+    parser.add_argument('--samples', type=int, default=10)
+    parser.add_argument('--sample-interval', type=float, default=60)
+    args = parser.parse_args()
+    if args.record:
+        record(args.recording, args.tickers.split(','), args.samples, args.sample_interval)
+        sys.exit(0)
+    server = MockCoinGecko(args.recording, args.port, args.latency, args.jitter, args.error_rate, args.throttle_rate)
+    print(f"Mock CoinGecko at {server.base_url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from PyQt6.QtCore import QObject, QTimer
+from PyQt6.QtNetwork import QHostAddress
+from PyQt6.QtWebSockets import QWebSocketServer
+
+from mock_coingecko import RECORDING
+
+
+class MockStream(QObject):
+    # a local stand-in for Binance's combined aggTrade stream: answers SUBSCRIBE/UNSUBSCRIBE
+    # and sends each client trades for the pairs it asked for, as a random walk from the
+    # recorded prices, at a fixed number of messages per second
+    def __init__(self, recording=RECORDING, port=0, rate=100, seed=None, parent=None):
+        super().__init__(parent)
+        with open(recording, 'r') as f:
+            recording = json.load(f)
+        snapshot = recording['simple_price'][0]
+        self.prices = {}  # "BTC" -> price
+        for coin in recording['coins_list']:
+            quote = snapshot.get(coin['id'])
+            if quote and 'usd' in quote:
+                self.prices.setdefault(coin['symbol'].upper(), quote['usd'])
+        self.random = random.Random(seed)
+        self.clients = {}  # socket -> subscribed streams
+        self.messages = 0
+        self.trade_id = 0
+        self.server = QWebSocketServer("mock-stream", QWebSocketServer.SslMode.NonSecureMode, self)
+        if not self.server.listen(QHostAddress(QHostAddress.SpecialAddress.LocalHost), port):
+            raise OSError(self.server.errorString())
+        self.server.newConnection.connect(self.on_connection)
+        self.timer = QTimer(self)
+        self.timer.setInterval(max(int(1000 / rate), 1))
+        self.timer.timeout.connect(self.send_trade)
+        self.timer.start()
+
+    @property
+    def url(self):
+        return f"ws://127.0.0.1:{self.server.serverPort()}/stream"
+
+    def on_connection(self):
+        socket = self.server.nextPendingConnection()
+        self.clients[socket] = set()
+        socket.textMessageReceived.connect(lambda message, socket=socket: self.on_message(socket, message))
+        socket.disconnected.connect(lambda socket=socket: self.clients.pop(socket, None))
+
+    def on_message(self, socket, message):
+        try:
+            request = json.loads(message)
+            streams = set(request['params'])
+        except (ValueError, KeyError, TypeError):
+            return
+        if request.get('method') == 'SUBSCRIBE':
+            self.clients[socket] |= streams
+        elif request.get('method') == 'UNSUBSCRIBE':
+            self.clients[socket] -= streams
+        socket.sendTextMessage(json.dumps({'result': None, 'id': request.get('id')}))
+
+    def send_trade(self):
+        for socket, streams in list(self.clients.items()):
+            if not streams:
+                continue
+            stream = self.random.choice(sorted(streams))
+            symbol = stream.split('@')[0].upper()
+            base = symbol[:-4] if symbol.endswith('USDT') else symbol
+            price = self.prices.get(base, 100.0) * (1 + self.random.gauss(0, 0.0005))
+            self.prices[base] = price
+            self.trade_id += 1
+            now = int(time.time() * 1000)
+            socket.sendTextMessage(json.dumps({'stream': stream, 'data': {
+                'e': 'aggTrade', 'E': now, 's': symbol, 'a': self.trade_id, 'p': f"{price:.8g}",
+                'q': f"{self.random.uniform(0.001, 2):.4f}", 'T': now, 'm': self.random.random() < 0.5}}))
+            self.messages += 1
+
+    def drop_clients(self):
+        # cut every connection, to watch the app reconnect and subscribe again
+        for socket in list(self.clients):
+            socket.close()
+
+    def close(self):
+        self.timer.stop()
+        self.drop_clients()
+        self.server.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve a Binance-style aggTrade WebSocket stream for --stream-url")
+    parser.add_argument('--recording', default=RECORDING, help="starting prices are taken from its first sample")
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--rate', type=float, default=100, help="messages per second to each client")
+    parser.add_argument('--drop-every', type=float, default=0, help="disconnect clients every N seconds")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    from PyQt6.QtCore import QCoreApplication
+    app = QCoreApplication(sys.argv[:1])
+    try:
+        stream = MockStream(os.path.abspath(args.recording), args.port, args.rate, args.seed)
+    except OSError as e:
+        print(f"Could not listen on port {args.port}: {e}")
+        sys.exit(1)
+    if args.drop_every:
+        dropper = QTimer()
+        dropper.timeout.connect(stream.drop_clients)
+        dropper.start(int(args.drop_every * 1000))
+    print(f"Mock stream at {stream.url}", flush=True)
+    sys.exit(app.exec())
@@ -0,0 +1,275 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.realpath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from mock_coingecko import MockCoinGecko, RECORDING
+
+HEARTBEAT_MS = 10  # how often the UI thread is expected to get a turn
+STALL_MS = 50  # a heartbeat this late counts as a stall
+
+
+def summarize(values):
+    if not values:
+        return {'count': 0}
+    ordered = sorted(values)
+    def at(percent):
+        return ordered[min(int(len(ordered) * percent / 100), len(ordered) - 1)]
+    return {'count': len(ordered), 'mean': sum(ordered) / len(ordered), 'p50': at(50), 'p90': at(90),
+            'p99': at(99), 'max': ordered[-1]}
+
+
+def rss_mb():
+    # ru_maxrss is kilobytes on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def prepare_home(home, recording, count, interval):
+    # a throwaway config with the first recorded coins as favorites
+    for variable in ('XDG_CONFIG_HOME', 'XDG_DATA_HOME', 'XDG_CACHE_HOME'):
+        os.environ[variable] = os.path.join(home, variable.lower())
+    tickers = list(recording['simple_price'][0])[:count]
+    favorites = {ticker: {'color': f"#{random.randrange(0x1000000):06x}", 'text_color': '#ffffff',
+                          'low_threshold': None, 'high_threshold': None} for ticker in tickers}
+    config = os.path.join(os.environ['XDG_CONFIG_HOME'], 'coinwatcher')
+    os.makedirs(config)
+    with open(os.path.join(config, 'settings.json'), 'w') as f:
+        json.dump({'version': 1, 'favorites': favorites, 'interval': interval}, f)
+    return tickers
+
+
+class Bench:
+    def __init__(self, args, app, ticker, server, recording):
+        from PyQt6.QtCore import QTimer
+        self.args = args
+        self.app = app
+        self.ticker = ticker
+        self.server = server
+        self.recording = recording
+        self.results = {}
+        self.fetch_started = None
+        self.fetch_latencies = []
+        self.outcomes = {'ok': 0, 'failed': 0, 'rate_limited': 0}
+        self.lags = []
+
+        ticker.scheduler.fire.connect(self.on_fire)
+        ticker.fetch_worker.prices_ready.connect(lambda prices: self.on_done('ok'))
+        ticker.fetch_worker.fetch_failed.connect(lambda error: self.on_done('failed'))
+        ticker.fetch_worker.rate_limited.connect(lambda retry_after: self.on_done('rate_limited'))
+
+        self.heartbeat = QTimer()
+        self.heartbeat.setInterval(HEARTBEAT_MS)
+        self.heartbeat.timeout.connect(self.on_heartbeat)
+        self.last_beat = None
+
+    def on_fire(self):
+        self.fetch_started = time.monotonic()
+
+    def on_done(self, outcome):
+        self.outcomes[outcome] += 1
+        if self.fetch_started is not None:
+            self.fetch_latencies.append((time.monotonic() - self.fetch_started) * 1000)
+            self.fetch_started = None
+
+    def on_heartbeat(self):
+        now = time.monotonic()
+        if self.last_beat is not None:
+            self.lags.append(max((now - self.last_beat) * 1000 - HEARTBEAT_MS, 0.0))
+        self.last_beat = now
+
+    def start(self):
+        from PyQt6.QtCore import QTimer
+        self.live_started = time.monotonic()
+        self.heartbeat.start()
+        QTimer.singleShot(int(self.args.duration * 1000), self.finish)
+
+    def finish(self):
+        self.live_ended = time.monotonic()
+        self.heartbeat.stop()
+        # nothing else may poll while the offline phases run
+        self.ticker.scheduler.timer.stop()
+        self.ticker.scheduler.coalesce_timer.stop()
+        self.ticker.markets_timer.stop()
+        self.ticker.fetch_worker.cancel()
+        self.results['fetch_latency_ms'] = summarize(self.fetch_latencies)
+        self.results['fetch_outcomes'] = self.outcomes
+        self.results['ui_stall'] = self.stall_results()
+        self.results['requests'] = self.request_results()
+        self.results['icon_render'] = self.icon_results()
+        self.results['show_price_us'] = self.show_price_results()
+        self.results['memory'] = self.memory_results()
+        self.app.quit()
+
+    def stall_results(self):
+        stalls = [lag for lag in self.lags if lag >= STALL_MS]
+        return {'heartbeat_lag_ms': summarize(self.lags), 'stalls': len(stalls),
+                'stalled_ms': sum(stalls), 'stall_threshold_ms': STALL_MS}
+
+    def request_results(self):
+        from rate_limit import RATE_LIMIT_PER_MINUTE, BUDGET_SHARE
+        log = self.server.requests_between(self.live_started, self.live_ended)
+        times = [entry[0] for entry in log]
+        statuses = {}
+        for _, status in log:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        duration = self.live_ended - self.live_started
+        busiest = None
+        if duration >= 60:
+            # the most requests that went out in any 60 second window
+            busiest = 0
+            first = 0
+            for last, timestamp in enumerate(times):
+                while timestamp - times[first] >= 60:
+                    first += 1
+                busiest = max(busiest, last - first + 1)
+        return {'total': len(log), 'per_minute': len(log) * 60 / duration, 'busiest_minute': busiest,
+                'by_status': statuses, 'rate_limit_per_minute': RATE_LIMIT_PER_MINUTE,
+                'budget_per_minute': RATE_LIMIT_PER_MINUTE * BUDGET_SHARE,
+                'within_limit': busiest <= RATE_LIMIT_PER_MINUTE if busiest is not None else None}
+
+    def icon_results(self):
+        from icon_cache import IconCache, THRESHOLD_OPACITIES
+        cache = IconCache(self.ticker.icon_path)
+        colors = [f"#{random.randrange(0x1000000):06x}" for _ in range(self.args.icon_colors)]
+        keys = [(color, opacity) for color in colors for opacity in THRESHOLD_OPACITIES]
+        started = time.perf_counter()
+        cache.prewarm(colors)  # grows the cache to fit every key, as the app does for its favorites
+        cold = (time.perf_counter() - started) * 1000 / len(keys)
+        rendered = dict(cache.icons)
+        started = time.perf_counter()
+        for _ in range(10):
+            for color, opacity in keys:
+                cache.get(color, opacity)
+        warm = (time.perf_counter() - started) * 1000 / (len(keys) * 10)
+        # a key rendered again would hold a new icon, so the warm pass must only have hit
+        assert all(cache.icons.get(key) is icon for key, icon in rendered.items()), "warm pass re-rendered icons"
+        return {'renders': len(rendered), 'cold_ms': cold, 'cached_ms': warm}
+
+    def show_price_results(self):
+        if self.ticker.ticker not in self.ticker.price_table:
+            return None
+        timings = []
+        for _ in range(self.args.show_price_calls):
+            started = time.perf_counter()
+            self.ticker.show_price()
+            timings.append((time.perf_counter() - started) * 1e6)
+        return summarize(timings)
+
+    def memory_results(self):
+        # replay days of polling straight into the data path, with simulated timestamps
+        from PyQt6.QtWidgets import QApplication
+        snapshots = [{ticker: quote['usd'] for ticker, quote in snapshot.items()}
+                     for snapshot in self.recording['simple_price']]
+        polls_per_day = int(86400 / self.args.poll_interval)
+        gc.collect()
+        tracemalloc.start()
+        traced_start = tracemalloc.get_traced_memory()[0]
+        rss_start = rss_mb()
+        clock = time.time()
+        days = []
+        started = time.perf_counter()
+        for day in range(self.args.days):
+            for poll in range(polls_per_day):
+                clock += self.args.poll_interval
+                self.ticker.apply_prices(snapshots[(day * polls_per_day + poll) % len(snapshots)], clock)
+                if poll % 100 == 0:
+                    self.ticker.price_cache.flush()
+                    QApplication.processEvents()
+            gc.collect()
+            days.append({'day': day + 1, 'traced_mb': (tracemalloc.get_traced_memory()[0] - traced_start) / 2 ** 20,
+                         'max_rss_mb': rss_mb()})
+        elapsed = time.perf_counter() - started
+        tracemalloc.stop()
+        growth = (days[-1]['traced_mb'] - days[0]['traced_mb']) / (len(days) - 1) if len(days) > 1 else None
+        return {'simulated_days': self.args.days, 'polls': polls_per_day * self.args.days,
+                'apply_prices_us': elapsed * 1e6 / (polls_per_day * self.args.days),
+                'start_max_rss_mb': rss_start, 'per_day': days, 'traced_growth_mb_per_day': growth}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run CoinWatcher headless against a mock CoinGecko and report JSON")
+    parser.add_argument('--recording', default=RECORDING)
+    parser.add_argument('--duration', type=float, default=60, help="seconds of live polling against the mock")
+    parser.add_argument('--tickers', type=int, default=10, help="how many recorded coins to make favorites")
+    parser.add_argument('--interval', type=int, default=2, help="poll interval, low so the request budget is the limit")
+    parser.add_argument('--latency', type=float, default=0.08)
+    parser.add_argument('--jitter', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.02)
+    parser.add_argument('--throttle-rate', type=float, default=0.02)
+    parser.add_argument('--retry-after', type=int, default=5)
+    parser.add_argument('--days', type=int, default=3, help="days of polling simulated for memory growth")
+    parser.add_argument('--poll-interval', type=float, default=60, help="seconds between simulated polls")
+    parser.add_argument('--icon-colors', type=int, default=40)
+    parser.add_argument('--show-price-calls', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default=None, help="write the JSON here instead of stdout")
+    args = parser.parse_args()
+
+    args.recording = os.path.abspath(args.recording)
+    args.output = args.output and os.path.abspath(args.output)
+    random.seed(args.seed)
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    with open(args.recording, 'r') as f:
+        recording = json.load(f)
+    with tempfile.TemporaryDirectory(prefix='coinwatcher-bench-') as home:
+        prepare_home(home, recording, args.tickers, args.interval)
+        os.chdir(home)  # so a stray favorite_tickers.json in the checkout isn't imported
+        server = MockCoinGecko(args.recording, 0, args.latency, args.jitter, args.error_rate,
+                               args.throttle_rate, args.retry_after, args.seed).start()
+
+        started = time.perf_counter()
+        from PyQt6.QtWidgets import QApplication
+        from PyQt6.QtCore import QT_VERSION_STR
+        app = QApplication(sys.argv[:1])
+        from crypto_ticker import CryptoTicker, VERSION
+        ticker = CryptoTicker(base_url=server.base_url)
+        startup_ms = (time.perf_counter() - started) * 1000
+
+        bench = Bench(args, app, ticker, server, recording)
+        bench.start()
+        app.exec()
+        server.shutdown()
+
+    report = {
+        'bench': 'coinwatcher',
+        'version': VERSION,
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'qt': QT_VERSION_STR,
+        'platform': platform.platform(),
+        'config': {key: value for key, value in vars(args).items() if key != 'output'},
+        'results': {'startup_ms': startup_ms, **bench.results},
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
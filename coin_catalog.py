@@ -0,0 +1,131 @@
+import bisect
+import heapq
+import json
+import os
+import time
+from paths import cache_dir
+
+CATALOG_TTL = 7 * 24 * 60 * 60
+SEARCH_LIMIT = 20
+
+# match tiers, lower ranks first
+EXACT_SYMBOL, EXACT_NAME, SYMBOL_PREFIX, NAME_PREFIX, WORD_PREFIX, SUBSTRING = range(6)
+
+
+class CoinCatalog:
+    # CoinGecko's /coins/list, cached on disk and indexed for search-as-you-type
+    def __init__(self, fetcher, path=None, ttl=CATALOG_TTL, allow_request=None):
+        self.fetcher = fetcher
+        self.path = path or os.path.join(cache_dir(), 'coins.json')
+        self.ttl = ttl
+        self.allow_request = allow_request or (lambda: True)
+        self.coins = []  # (id, symbol, name)
+        self.ids = set()
+        self.symbols = {}
+        self.keys = []  # sorted search keys, parallel to self.entries
+        self.entries = []  # (coin index, prefix tier, exact tier)
+        self.trigrams = {}
+        self.loaded = False
+
+    def read_cache(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f), time.time() - os.path.getmtime(self.path)
+        except (OSError, ValueError):
+            return None, None
+
+    def write_cache(self, coins):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(coins, f, separators=(',', ':'))
+        os.replace(temp_path, self.path)
+
+    def download(self):
+        data = self.fetcher.get_json(f"{self.fetcher.base_url}/coins/list")
+        return [[coin['id'], coin['symbol'], coin['name']] for coin in data]
+
+    def load(self):
+        coins, age = self.read_cache()
+        if coins is None or age > self.ttl:
+            if self.allow_request():
+                try:
+                    coins = self.download()
+                    self.write_cache(coins)
+                except Exception:
+                    if coins is None:
+                        raise
+            elif coins is None:
+                raise RuntimeError("no request budget left to download the coin list")
+        self.build(coins)
+        return self
+
+    def build(self, coins):
+        keyed = []
+        trigrams = {}
+        for index, (coin_id, symbol, name) in enumerate(coins):
+            symbol = symbol.lower()
+            name = name.lower()
+            keyed.append((symbol, index, SYMBOL_PREFIX, EXACT_SYMBOL))
+            keyed.append((coin_id, index, NAME_PREFIX, EXACT_NAME))
+            if name != coin_id:
+                keyed.append((name, index, NAME_PREFIX, EXACT_NAME))
+            for word in name.split()[1:]:
+                keyed.append((word, index, WORD_PREFIX, WORD_PREFIX))
+            text = f"{coin_id} {name}"
+            for gram in {text[i:i + 3] for i in range(len(text) - 2)}:
+                trigrams.setdefault(gram, []).append(index)
+        keyed.sort()
+        self.coins = [tuple(coin) for coin in coins]
+        self.ids = {coin[0] for coin in coins}
+        # symbols aren't unique (plenty of tokens call themselves "eth"), so only the ones a
+        # single coin goes by can name an exchange pair
+        owners = {}
+        for coin_id, symbol, _ in coins:
+            owners[symbol.lower()] = owners.get(symbol.lower(), 0) + 1
+        self.symbols = {coin_id: symbol for coin_id, symbol, _ in coins if owners[symbol.lower()] == 1}
+        self.keys = [entry[0] for entry in keyed]
+        self.entries = [entry[1:] for entry in keyed]
+        self.trigrams = trigrams
+        self.loaded = True
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        query = query.strip().lower()
+        if not query or not self.loaded:
+            return []
+        best = {}
+        start = bisect.bisect_left(self.keys, query)
+        for position in range(start, len(self.keys)):
+            key = self.keys[position]
+            if not key.startswith(query):
+                break
+            index, prefix_tier, exact_tier = self.entries[position]
+            tier = exact_tier if key == query else prefix_tier
+            if tier < best.get(index, SUBSTRING + 1):
+                best[index] = tier
+
+        if len(best) < limit and len(query) >= 3:
+            # substring matches through the trigram index, smallest posting list first
+            postings = sorted((self.trigrams.get(query[i:i + 3], ()) for i in range(len(query) - 2)), key=len)
+            candidates = set(postings[0]).intersection(*postings[1:]) if postings[0] else ()
+            for index in candidates:
+                if index not in best:
+                    coin_id, symbol, name = self.coins[index]
+                    if query in coin_id or query in name.lower():
+                        best[index] = SUBSTRING
+
+        ranked = heapq.nsmallest(limit, best.items(), key=lambda item: (item[1], len(self.coins[item[0]][0]), self.coins[item[0]][0]))
+        return [(self.coins[index], tier) for index, tier in ranked]
+
+    def resolve(self, text):
+        # turn what the user typed ("SHIB", "Shiba Inu") into a CoinGecko id ("shiba-inu")
+        text = text.strip().lower()
+        if not self.loaded or text in self.ids:
+            return text
+        results = self.search(text, 1)
+        if results and results[0][1] <= EXACT_NAME:
+            return results[0][0][0]
+        return text
+
+    def symbol(self, coin_id):
+        return self.symbols.get(coin_id)
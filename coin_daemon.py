@@ -0,0 +1,262 @@
+import asyncio
+import json
+import os
+import time
+from urllib.parse import urlsplit, parse_qs
+from price_fetcher import PriceFetcher, PriceTable, RateLimited
+from price_history import PriceHistory
+from paths import data_dir
+from settings_store import SettingsStore
+from alerts import AlertEngine, favorite_rules, alert_text
+from rate_limit import TokenBucket, Backoff, RATE_LIMIT_PER_MINUTE, BUDGET_SHARE
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8723
+REQUEST_TTL = 10 * 60  # tickers asked for by clients are polled this long after the last ask
+READ_TIMEOUT = 10
+LONG_POLL_TIMEOUT = 55
+NEW_TICKER_WAIT = 15  # how long a request for an unseen ticker waits for the next fetch
+MAX_CLIENT_BUFFER = 256 * 1024  # a subscriber this far behind is dropped rather than buffered
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}
+
+
+def load_favorites(path=None):
+    # the tray app's favorites, read from the same settings file
+    return SettingsStore(path).get('favorites')
+
+
+class PriceDaemon:
+    # one upstream poller shared by any number of local clients over HTTP/JSON and SSE
+    def __init__(self, tickers=(), favorites=None, interval=60, fetcher=None, history=None):
+        self.favorites = favorites if favorites is not None else load_favorites()
+        self.tickers = list(dict.fromkeys([*tickers, *self.favorites]))
+        self.interval = interval
+        self.fetcher = fetcher or PriceFetcher()
+        # kept apart from the tray's history so two processes never write the same ring
+        self.history = history or PriceHistory(os.path.join(data_dir(), 'daemon', 'history'))
+        self.table = PriceTable()
+        self.alert_engine = AlertEngine()
+        self.alert_engine.set_rules(favorite_rules(self.favorites))
+        self.bucket = TokenBucket(RATE_LIMIT_PER_MINUTE * BUDGET_SHARE)
+        self.backoff = Backoff()
+        self.requested = {}
+        self.subscribers = set()
+        self.version = 0
+        self.fetched = set()  # tickers the last successful fetch asked for
+        self.last_error = None
+        self.updated = None
+        self.wake = None
+        self.routes = {
+            '/prices': self.get_prices,
+            '/history': self.get_history,
+            '/events': self.get_events,
+            '/api/v3/simple/price': self.get_simple_price,
+        }
+
+    def watched_tickers(self):
+        cutoff = time.time() - REQUEST_TTL
+        self.requested = {ticker: asked for ticker, asked in self.requested.items() if asked > cutoff}
+        return list(dict.fromkeys([*self.tickers, *self.requested]))
+
+    def request_tickers(self, tickers):
+        now = time.time()
+        new = False
+        for ticker in tickers:
+            new = new or (ticker not in self.table and ticker not in self.requested)
+            self.requested[ticker] = now
+        if new:
+            self.wake.set()
+
+    async def poll(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            tickers = self.watched_tickers()
+            cost = max(len(self.fetcher.chunk_ids(tickers)), 1)
+            wait = max(self.backoff.remaining(), self.bucket.time_until(cost))
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            self.bucket.try_take(cost)
+            # cleared before the fetch, so a ticker asked for while it runs gets a fetch of its own
+            self.wake.clear()
+            try:
+                prices = await loop.run_in_executor(None, self.fetcher.fetch, tickers)
+            except RateLimited as e:
+                self.bucket.drain()
+                self.last_error = str(e)
+                delay = self.backoff.next_delay(e.retry_after)
+            except Exception as e:
+                self.last_error = str(e)
+                delay = self.backoff.next_delay(limit=self.interval)
+            else:
+                self.backoff.reset()
+                self.last_error = None
+                self.fetched = set(tickers)
+                self.publish(prices)
+                delay = max(self.interval, 60.0 * cost / self.bucket.rate_per_minute)
+            try:
+                await asyncio.wait_for(self.wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def publish(self, prices):
+        now = time.time()
+        self.table.update(prices, now)
+        self.history.append_many(prices, now)
+        self.version += 1
+        self.broadcast('prices', self.snapshot(prices))
+        for alert in self.alert_engine.evaluate(self.table.prices, self.history):
+            text = alert_text(alert)
+            print(text, flush=True)
+            self.broadcast('alert', {'ticker': alert.ticker, 'text': text, 'value': alert.value})
+        # wake every long-poll waiter, then hand out a fresh event for the next round
+        self.updated.set()
+        self.updated = asyncio.Event()
+
+    def snapshot(self, tickers=None):
+        tickers = self.table.prices.keys() if tickers is None else tickers
+        prices = {}
+        for ticker in tickers:
+            if ticker in self.table:
+                prices[ticker] = {
+                    'usd': self.table.get(ticker),
+                    'previous': self.table.get_previous(ticker),
+                    'updated': self.table.updated[ticker],
+                }
+        return {'version': self.version, 'error': self.last_error, 'prices': prices}
+
+    def broadcast(self, event, data):
+        if not self.subscribers:
+            return
+        payload = f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+        for writer in list(self.subscribers):
+            if writer.is_closing() or writer.transport.get_write_buffer_size() > MAX_CLIENT_BUFFER:
+                self.subscribers.discard(writer)
+                writer.close()
+            else:
+                writer.write(payload)
+
+    async def wait_for_update(self, timeout):
+        try:
+            await asyncio.wait_for(self.updated.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def wait_for_tickers(self, tickers, timeout):
+        # until every ticker has a price, or a fetch that asked for the missing ones came back
+        # without them (not an id the API knows), or the timeout runs out
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            missing = [ticker for ticker in tickers if ticker not in self.table]
+            remaining = deadline - loop.time()
+            if not missing or remaining <= 0:
+                return
+            version = self.version
+            await self.wait_for_update(remaining)
+            missing = [ticker for ticker in tickers if ticker not in self.table]
+            if self.version != version and missing and self.fetched.issuperset(missing):
+                return
+
+    async def handle(self, reader, writer):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), READ_TIMEOUT)
+            method, target, _ = request_line.decode('latin-1').split(' ', 2)
+            while (await asyncio.wait_for(reader.readline(), READ_TIMEOUT)) not in (b'\r\n', b'\n', b''):
+                pass
+            url = urlsplit(target)
+            route = self.routes.get(url.path.rstrip('/') or '/')
+            if route is None:
+                await self.respond(writer, 404, {'error': f"unknown path {url.path}"})
+            elif method != 'GET':
+                await self.respond(writer, 405, {'error': "only GET is supported"})
+            else:
+                await route(parse_qs(url.query), reader, writer)
+        except (ValueError, asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            self.subscribers.discard(writer)
+            writer.close()
+
+    async def respond(self, writer, status, body):
+        content = json.dumps(body, separators=(',', ':')).encode()
+        writer.write(f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                     f"Content-Type: application/json\r\n"
+                     f"Content-Length: {len(content)}\r\n"
+                     f"Connection: close\r\n\r\n".encode() + content)
+        await writer.drain()
+
+    def query_ids(self, query):
+        return [ticker for value in query.get('ids', []) for ticker in value.lower().split(',') if ticker]
+
+    async def get_prices(self, query, reader, writer):
+        # ?ids=a,b limits the answer (and keeps those tickers polled); ?since=<version> long-polls
+        ids = self.query_ids(query) or None
+        if ids:
+            self.request_tickers(ids)
+        try:
+            since = int(query['since'][0]) if 'since' in query else None
+        except ValueError:
+            await self.respond(writer, 400, {'error': "since must be a version number"})
+            return
+        if since is not None and since >= self.version:
+            await self.wait_for_update(LONG_POLL_TIMEOUT)
+        elif ids:
+            await self.wait_for_tickers(ids, NEW_TICKER_WAIT)
+        await self.respond(writer, 200, self.snapshot(ids))
+
+    async def get_history(self, query, reader, writer):
+        try:
+            minutes = float(query.get('minutes', ['60'])[0])
+        except ValueError:
+            await self.respond(writer, 400, {'error': "minutes must be a number"})
+            return
+        ids = self.query_ids(query) or list(self.table.prices)
+        await self.respond(writer, 200, {ticker: self.history.samples(ticker, minutes * 60) for ticker in ids})
+
+    async def get_simple_price(self, query, reader, writer):
+        # same shape as CoinGecko's endpoint, so the tray app can use the daemon as its upstream
+        ids = self.query_ids(query)
+        self.request_tickers(ids)
+        await self.wait_for_tickers(ids, NEW_TICKER_WAIT)
+        await self.respond(writer, 200, {ticker: {'usd': self.table.get(ticker)} for ticker in ids if ticker in self.table})
+
+    async def get_events(self, query, reader, writer):
+        writer.write(b"HTTP/1.1 200 OK\r\n"
+                     b"Content-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\n"
+                     b"Connection: keep-alive\r\n\r\n")
+        snapshot = json.dumps(self.snapshot(), separators=(',', ':'))
+        writer.write(f"event: prices\ndata: {snapshot}\n\n".encode())
+        await writer.drain()
+        self.subscribers.add(writer)
+        # nothing more is read from a subscriber, this only returns once it hangs up
+        while await reader.read(1024):
+            pass
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None):
+        self.updated = asyncio.Event()
+        self.wake = asyncio.Event()
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            server = await asyncio.start_unix_server(self.handle, path=socket_path)
+            print(f"CoinWatcher daemon listening on {socket_path}", flush=True)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+            print(f"CoinWatcher daemon listening on http://{host}:{port}", flush=True)
+        poller = asyncio.create_task(self.poll())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            poller.cancel()
+
+    def run(self, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None):
+        try:
+            asyncio.run(self.serve(host, port, socket_path))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.fetcher.close()
+            self.history.close()
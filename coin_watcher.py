@@ -1,8 +1,79 @@
+import time
+STARTED = time.perf_counter()
 import sys
-from PyQt6.QtWidgets import QApplication
-from crypto_ticker import CryptoTicker
+import argparse
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="CoinWatcher crypto price tray app")
+    parser.add_argument('--daemon', action='store_true',
+                        help="run headless and serve prices to local clients instead of showing a tray icon")
+    parser.add_argument('--host', default=None, help="daemon listen address (default 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=None, help="daemon listen port (default 8723)")
+    parser.add_argument('--socket', default=None, help="daemon Unix socket path, instead of TCP")
+    parser.add_argument('--interval', type=int, default=60, help="daemon poll interval in seconds")
+    parser.add_argument('--tickers', default='', help="comma separated ids the daemon polls besides the favorites")
+    parser.add_argument('--providers', default=None,
+                        help="comma separated price sources: coingecko, kraken, binance, coincap "
+                             "(needs COINCAP_API_KEY) (default coingecko,kraken,binance)")
+    parser.add_argument('--strategy', choices=('fastest', 'median'), default='fastest',
+                        help="take the first answer from the healthiest sources, or the median across all of them")
+    parser.add_argument('--stream-url', default=None,
+                        help="WebSocket feed for favorites marked for live streaming (Binance-style aggTrade)")
+    parser.add_argument('--upstream', default=None,
+                        help="API base URL for the tray app, e.g. http://127.0.0.1:8723/api/v3 to share a daemon")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="print how long each startup step took once the tray icon is up")
+    parser.add_argument('--metrics', action='store_true',
+                        help="collect timings from the start (they can also be turned on under Diagnostics)")
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help="serve metrics on 127.0.0.1:PORT, /metrics for Prometheus and /metrics.json")
+    parser.add_argument('--metrics-dump', default=None, help="write the metrics as JSON to this file on exit")
+    return parser.parse_known_args()
+
 
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    crypto_ticker = CryptoTicker()
+    args, qt_args = parse_args()
+    import startup_profile
+    if args.profile_startup:
+        startup_profile.enable(STARTED)
+    startup_profile.mark("arguments parsed")
+    if args.metrics or args.metrics_port is not None or args.metrics_dump:
+        import metrics
+        metrics.enable()
+        if args.metrics_port is not None:
+            metrics.serve(args.metrics_port)
+    from providers import create_fetcher, needs_symbols, DEFAULT_PROVIDERS
+    providers = args.providers or DEFAULT_PROVIDERS
+    if args.daemon:
+        from coin_catalog import CoinCatalog
+        from coin_daemon import PriceDaemon, DEFAULT_HOST, DEFAULT_PORT
+        tickers = [ticker for ticker in args.tickers.lower().split(',') if ticker]
+        fetcher = create_fetcher(providers, args.strategy, symbol_lookup=lambda ticker: catalog.symbol(ticker))
+        catalog = CoinCatalog(fetcher)
+        if needs_symbols(providers):
+            try:
+                catalog.load()
+            except Exception as e:
+                print(f"Could not load the coin list: {e}")
+        daemon = PriceDaemon(tickers, interval=args.interval, fetcher=fetcher)
+        daemon.run(args.host or DEFAULT_HOST, args.port or DEFAULT_PORT, args.socket)
+        if args.metrics_dump:
+            metrics.dump(args.metrics_dump)
+        sys.exit(0)
+
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtCore import QTimer
+    startup_profile.mark("Qt imported")
+    app = QApplication(sys.argv[:1] + qt_args)
+    startup_profile.mark("QApplication created")
+    from crypto_ticker import CryptoTicker
+    startup_profile.mark("crypto_ticker imported")
+    crypto_ticker = CryptoTicker(base_url=args.upstream, providers=providers, strategy=args.strategy,
+                                 stream_url=args.stream_url)
+    startup_profile.mark("CryptoTicker constructed")
+    if args.metrics_dump:
+        app.aboutToQuit.connect(lambda: metrics.dump(args.metrics_dump))
+    if args.profile_startup:
+        QTimer.singleShot(0, startup_profile.report)
     sys.exit(app.exec())
@@ -1,91 +1,146 @@
 import os
-import json
-import requests
+import time
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, 
                              QSlider, QMenu, QSystemTrayIcon, QPushButton, QListWidget, 
-                             QColorDialog, QListWidgetItem, QDialog, QSizePolicy, 
-                             QApplication)
-from PyQt6.QtGui import QIcon, QAction, QPixmap, QCursor, QColor, QPainter, QMouseEvent
-from PyQt6.QtCore import Qt, QTimer, QPoint
-from floating_window import FloatingPriceWindow
+                             QListWidgetItem, QDialog, QSizePolicy, 
+                             QApplication, QCompleter, QCheckBox)
+from PyQt6.QtGui import (QIcon, QAction, QActionGroup, QCursor, QColor, QMouseEvent,
+                         QStandardItemModel, QStandardItem)
+from PyQt6.QtCore import Qt, QPoint, QThreadPool, QTimer
+from price_fetcher import PriceFetcher, PriceTable
+from providers import create_fetcher, needs_symbols, DEFAULT_PROVIDERS, FASTEST
+from fetch_worker import FetchWorker, BackgroundTask
+from scheduler import RequestScheduler
+from price_history import PriceHistory
+from coin_catalog import CoinCatalog
+from markets import MarketMovers
+from icon_cache import IconCache, LOW_OPACITY, HIGH_OPACITY, NORMAL_OPACITY
+from alerts import AlertEngine, ABOVE, BELOW, favorite_rules, alert_text
+from price_cache import LastPriceCache
+from settings_store import SettingsStore
+from portfolio import Portfolio, parse_lots, format_lots, pnl_text
+from currency import QuoteMatrix, BASE_CURRENCY, format_price, format_age, parse_currencies
+from startup_profile import mark
+import metrics
 
 VERSION = '1.0.2'
+CACHE_FLUSH_MS = 5000
+SETTINGS_SAVE_MS = 1000  # edits within this long of each other are saved together
+MARKETS_INTERVAL_MS = 15 * 60 * 1000  # the movers panel is a slow overview, not a ticker
+MARKETS_START_DELAY_MS = 30 * 1000  # let the favorites' first fetch go out first
+MARKETS_RETRY_MS = 5 * 60 * 1000
 
-class ColorSelectionDialog(QDialog):
-    def __init__(self, parent=None, bg_color=None, fg_color=None):
-        super().__init__(parent)
-        self.bg_color = bg_color or QColor(75, 0, 130)
-        self.fg_color = fg_color or QColor(255, 255, 255)
-        self.initUI()
-
-    def initUI(self):
-        layout = QVBoxLayout()
-
-        bg_layout = QHBoxLayout()
-        bg_label = QLabel("Background Color:")
-        self.bg_button = QPushButton()
-        self.bg_button.setStyleSheet(f"background-color: {self.bg_color.name()}; min-width: 100px; min-height: 30px;")
-        self.bg_button.clicked.connect(lambda: self.choose_color('bg'))
-        bg_layout.addWidget(bg_label)
-        bg_layout.addWidget(self.bg_button)
-        layout.addLayout(bg_layout)
-
-        fg_layout = QHBoxLayout()
-        fg_label = QLabel("Foreground Color:")
-        self.fg_button = QPushButton()
-        self.fg_button.setStyleSheet(f"background-color: {self.fg_color.name()}; min-width: 100px; min-height: 30px;")
-        self.fg_button.clicked.connect(lambda: self.choose_color('fg'))
-        fg_layout.addWidget(fg_label)
-        fg_layout.addWidget(self.fg_button)
-        layout.addLayout(fg_layout)
-
-        buttons = QHBoxLayout()
-        ok_button = QPushButton("OK")
-        ok_button.clicked.connect(self.accept)
-        cancel_button = QPushButton("Cancel")
-        cancel_button.clicked.connect(self.reject)
-        buttons.addWidget(ok_button)
-        buttons.addWidget(cancel_button)
-        layout.addLayout(buttons)
-
-        self.setLayout(layout)
-        self.setWindowTitle("Choose Colors")
-
-    def choose_color(self, color_type):
-        color = QColorDialog.getColor()
-        if color.isValid():
-            if color_type == 'bg':
-                self.bg_color = color
-                self.bg_button.setStyleSheet(f"background-color: {color.name()}; min-width: 100px; min-height: 30px;")
-            else:
-                self.fg_color = color
-                self.fg_button.setStyleSheet(f"background-color: {color.name()}; min-width: 100px; min-height: 30px;")
 
 class CryptoTicker(QWidget):
-    def __init__(self):
+    def __init__(self, base_url=None, providers=DEFAULT_PROVIDERS, strategy=FASTEST, stream_url=None):
         super().__init__()
-        self.ticker = "bitcoin"
-        self.interval = 60
+        self.settings = SettingsStore()
+        self.settings_timer = QTimer(self)
+        self.settings_timer.setSingleShot(True)
+        self.settings_timer.setInterval(SETTINGS_SAVE_MS)
+        self.settings_timer.timeout.connect(self.settings.flush)
+        QApplication.instance().aboutToQuit.connect(self.settings.close)
+        self.ticker = self.settings.get('ticker')
+        self.interval = self.settings.get('interval')
+        self.currency = self.settings.get('currency')
         self.current_price = None
-        self.previous_price = None
-        self.favorite_tickers = self.load_favorite_tickers()
-        self.floating_window = None
-        self.initUI()
-
-        self.setWindowFlags(Qt.WindowType.FramelessWindowHint)
+        self.offline_error = None
+        self.favorite_tickers = self.settings.get('favorites')
+        self.low_threshold = None
+        self.high_threshold = None
+        self.alert_engine = AlertEngine()
+        self.update_alert_rules()
+        self.price_table = PriceTable()
+        self.price_cache = LastPriceCache()
+        self.price_table.seed(self.price_cache.load())
+        self.quotes = QuoteMatrix(self.settings.get('currencies'))
+        self.quotes.seed_rates(self.price_cache.load_rates())
+        self.portfolio = Portfolio()
+        self.portfolio.set_holdings(self.favorite_tickers, self.price_table.prices)
+        self.cache_timer = QTimer(self)
+        self.cache_timer.setSingleShot(True)
+        self.cache_timer.setInterval(CACHE_FLUSH_MS)
+        self.cache_timer.timeout.connect(self.price_cache.flush)
+        mark("last prices loaded")
+        if base_url:
+            self.price_fetcher = PriceFetcher(base_url)
+        else:
+            self.price_fetcher = create_fetcher(providers, strategy, symbol_lookup=lambda ticker: self.catalog.symbol(ticker))
+        self.price_fetcher.set_quote_currencies(self.quotes.currencies)
+        self.price_history = PriceHistory()
+        mark("price sources and history")
+        QApplication.instance().aboutToQuit.connect(self.price_fetcher.close)
+        QApplication.instance().aboutToQuit.connect(self.close_history)
+        QApplication.instance().aboutToQuit.connect(self.price_cache.close)
+        self.fetch_worker = FetchWorker(self.price_fetcher, self)
+        self.fetch_worker.prices_ready.connect(self.on_prices_ready)
+        self.fetch_worker.fetch_failed.connect(self.on_fetch_failed)
+        self.fetch_worker.rate_limited.connect(self.on_rate_limited)
+        self.scheduler = RequestScheduler(self.interval, cost=self.request_cost, parent=self)
+        self.scheduler.fire.connect(self.update_price)
+        self.catalog = CoinCatalog(self.price_fetcher, allow_request=self.scheduler.bucket.try_take)
+        self.catalog_task = None
+        self.needs_catalog = not base_url and needs_symbols(providers)
+        self.movers = MarketMovers(self.price_fetcher, allow_request=self.scheduler.bucket.try_take)
+        self.movers_task = None
+        self.movers_panel = None
+        self.diagnostics_panel = None
+        self.markets_timer = QTimer(self)
+        self.markets_timer.setSingleShot(True)
+        self.markets_timer.timeout.connect(self.refresh_markets)
+        self.stream_url = stream_url
+        self.price_stream = None
+        self.stream_state = "stopped"
+        self.floating_window = None  # follows the active ticker
+        self.pinned_windows = {}  # ticker -> window bound to it
+        self.ticker_strip = None
+        self.board = None
+        self.settings_built = False
+        mark("workers and scheduler")
         self.dragging = False
         self.offset = QPoint()
+        self.initUI()
 
     def initUI(self):
         self.icon_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'icons/coin.png')
         self.custom_icon = QIcon(self.icon_path)
+        self.icon_cache = IconCache(self.icon_path)
+        self.icon_key = None
+        self.setWindowTitle('CoinWatcher Settings')
+        self.setWindowIcon(self.custom_icon)
 
+        self.setup_tray_icon()
+        mark("tray icon shown")
+
+        if self.ticker in self.price_table:
+            self.show_price()  # last known price, marked stale until the first refresh lands
+            mark("first tooltip")
+        self.scheduler.start()
+        self.update_stream()
+        # the tray is up, the rest can wait for the event loop
+        QTimer.singleShot(0, self.prewarm_icons)
+        if self.needs_catalog:
+            QTimer.singleShot(0, self.load_catalog)  # exchanges can't price most coins without it
+        QTimer.singleShot(0, self.start_markets)
+        QTimer.singleShot(0, self.restore_windows)
+
+    def build_settings(self):
+        # the settings window is only built the first time it is opened
+        self.settings_built = True
+        self.setWindowFlags(Qt.WindowType.FramelessWindowHint)
         layout = QVBoxLayout()
 
         ticker_layout = QHBoxLayout()
         ticker_label = QLabel("Ticker:")
         self.ticker_input = QLineEdit(self.ticker)
         self.ticker_input.editingFinished.connect(self.update_ticker)
+        self.ticker_input.textEdited.connect(self.search_catalog)
+        self.search_model = QStandardItemModel(self)
+        self.ticker_completer = QCompleter(self.search_model, self)
+        self.ticker_completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.ticker_completer.setCompletionRole(Qt.ItemDataRole.UserRole)
+        self.ticker_completer.activated.connect(lambda text: self.update_ticker())
+        self.ticker_input.setCompleter(self.ticker_completer)
         ticker_layout.addWidget(ticker_label)
         ticker_layout.addWidget(self.ticker_input)
         layout.addLayout(ticker_layout)
@@ -123,7 +178,11 @@ class CryptoTicker(QWidget):
         interval_layout.addWidget(self.slider_value_label)
         #interval_layout.addWidget(interval_label)
         interval_layout.addWidget(self.interval_slider)
-        
+
+        self.scheduler_status_label = QLabel()
+        interval_layout.addWidget(self.scheduler_status_label)
+        self.scheduler.status_changed.connect(self.update_scheduler_status)
+
         layout.addLayout(interval_layout)
 
         threshold_layout = QHBoxLayout()
@@ -143,22 +202,30 @@ class CryptoTicker(QWidget):
         threshold_layout.addWidget(self.high_threshold_input)
 
         layout.addLayout(threshold_layout)
+        self.show_thresholds()
+
+        currency_layout = QHBoxLayout()
+        currency_layout.addWidget(QLabel("Quote Currencies:"))
+        self.currencies_input = QLineEdit(", ".join(self.quotes.currencies))
+        self.currencies_input.setPlaceholderText("e.g. usd, eur, btc, eth")
+        self.currencies_input.editingFinished.connect(self.update_currencies)
+        currency_layout.addWidget(self.currencies_input)
+        layout.addLayout(currency_layout)
 
         close_button = QPushButton("Close")
         close_button.clicked.connect(self.hide)
         layout.addWidget(close_button)
 
         self.setLayout(layout)
-        self.setWindowTitle('CoinWatcher Settings')
-        self.setWindowIcon(self.custom_icon)
-
-        self.setup_tray_icon()
-
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_price)
-        self.timer.start(self.interval * 1000)
+        self.update_scheduler_status()
+        position = self.settings.get('settings_position')
+        if position:
+            self.move(QPoint(*position))
 
-        self.update_price()
+    def show_settings(self):
+        if not self.settings_built:
+            self.build_settings()
+        self.show()
 
     def setup_tray_icon(self):
         self.tray_icon = QSystemTrayIcon(self)
@@ -169,8 +236,22 @@ class CryptoTicker(QWidget):
         self.price_action = QAction("Loading...", self)
         self.price_action.triggered.connect(self.toggle_floating_window)
         self.tray_menu.addAction(self.price_action)
+        self.currency_menu = self.tray_menu.addMenu("Currency")
+        self.currency_group = None
+        self.update_currency_menu()
+        self.pin_menu = self.tray_menu.addMenu("Pin Window")
+        self.pin_menu.aboutToShow.connect(self.update_pin_menu)
+        self.strip_action = QAction("Ticker Strip", self, checkable=True)
+        self.strip_action.triggered.connect(self.set_ticker_strip)
+        self.tray_menu.addAction(self.strip_action)
+        movers_action = QAction("Top Movers", self)
+        movers_action.triggered.connect(self.show_movers)
+        self.tray_menu.addAction(movers_action)
+        diagnostics_action = QAction("Diagnostics", self)
+        diagnostics_action.triggered.connect(self.show_diagnostics)
+        self.tray_menu.addAction(diagnostics_action)
         settings_action = QAction("Settings", self)
-        settings_action.triggered.connect(self.show)
+        settings_action.triggered.connect(self.show_settings)
         self.tray_menu.addAction(settings_action)
         about_action = QAction("About", self)
         about_action.triggered.connect(self.show_about)
@@ -186,15 +267,6 @@ class CryptoTicker(QWidget):
         self.tray_icon.activated.connect(self.tray_icon_activated)
         self.tray_icon.show()
 
-    def toggle_floating_window(self):
-        if self.floating_window is None:
-            self.floating_window = FloatingPriceWindow()
-            self.floating_window.setWindowIcon(self.custom_icon)
-            self.floating_window.update_price(self.price_action.text())
-            self.floating_window.show()
-        else:
-            self.floating_window.setVisible(not self.floating_window.isVisible())
-
     def mousePressEvent(self, event: QMouseEvent):
         if event.button() == Qt.MouseButton.LeftButton:
             self.dragging = True
@@ -206,22 +278,20 @@ class CryptoTicker(QWidget):
 
     def mouseReleaseEvent(self, event: QMouseEvent):
         if event.button() == Qt.MouseButton.LeftButton:
+            if self.dragging:
+                self.save_settings(settings_position=[self.x(), self.y()])
             self.dragging = False
 
-    def load_favorite_tickers(self):
-        try:
-            with open('favorite_tickers.json', 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
-
-    def save_favorite_tickers(self):
-        with open('favorite_tickers.json', 'w') as f:
-            json.dump(self.favorite_tickers, f, indent=4) # keep it readable
+    def save_settings(self, **changes):
+        for key, value in changes.items():
+            self.settings.set(key, value)
+        self.settings.touch()
+        self.settings_timer.start()  # restarted by every edit, so a burst is written once
 
     def add_favorite(self):
         ticker = self.ticker_input.text().lower()
         if ticker and ticker not in self.favorite_tickers:
+            from color_dialog import ColorSelectionDialog
             color_dialog = ColorSelectionDialog(self)
             if color_dialog.exec() == QDialog.DialogCode.Accepted:
                 self.favorite_tickers[ticker] = {
@@ -231,9 +301,10 @@ class CryptoTicker(QWidget):
                     'high_threshold': None
                 }
                 self.update_favorites_list()
-                self.save_favorite_tickers()
-                if self.floating_window and self.ticker == ticker:
-                    self.update_floating_window()
+                self.save_settings()
+                self.prewarm_icons()
+                self.restyle(ticker)
+                self.update_strip_tickers()
 
     def edit_favorite(self):
         current_item = self.favorites_list.currentItem()
@@ -256,8 +327,26 @@ class CryptoTicker(QWidget):
             layout.addWidget(QLabel("High Threshold:"))
             layout.addWidget(high_threshold_input)
 
+            move_percent_input = QLineEdit(str(data['move_percent']) if data.get('move_percent') else "")
+            move_window_input = QLineEdit(str(data.get('move_window', 60)))
+            layout.addWidget(QLabel("Alert on % Move:"))
+            layout.addWidget(move_percent_input)
+            layout.addWidget(QLabel("Within Minutes:"))
+            layout.addWidget(move_window_input)
+
+            stream_checkbox = QCheckBox("Stream Live Prices (WebSocket)")
+            stream_checkbox.setChecked(bool(data.get('stream')))
+            layout.addWidget(stream_checkbox)
+
+            lots_input = QLineEdit(format_lots(data.get('lots', [])))
+            lots_input.setPlaceholderText("e.g. 0.5@30000, 0.25@42000")
+            layout.addWidget(QLabel("Holdings (quantity@price paid):"))
+            layout.addWidget(lots_input)
+
             save_button = QPushButton("Save")
-            save_button.clicked.connect(lambda: self.save_favorite_changes(ticker, low_threshold_input.text(), high_threshold_input.text(), dialog))
+            save_button.clicked.connect(lambda: self.save_favorite_changes(ticker, low_threshold_input.text(), high_threshold_input.text(), dialog,
+                                                                           move_percent_input.text(), move_window_input.text(),
+                                                                           stream_checkbox.isChecked(), lots_input.text()))
             layout.addWidget(save_button)
 
             dialog.setLayout(layout)
@@ -269,46 +358,59 @@ class CryptoTicker(QWidget):
             ticker = current_item.text()
             del self.favorite_tickers[ticker]
             self.update_favorites_list()
-            self.save_favorite_tickers()
+            self.save_settings()
+            self.update_alert_rules()
+            self.update_stream()
+            self.update_holdings()
+            self.restyle(ticker)
+            self.update_strip_tickers()
 
     def select_favorite(self, item):
         ticker = item.text()
         self.ticker_input.setText(ticker)
         self.update_ticker()
-        if self.floating_window:
-            self.update_floating_window()
 
     def change_colors(self, ticker):
         data = self.favorite_tickers[ticker]
+        from color_dialog import ColorSelectionDialog
         color_dialog = ColorSelectionDialog(self, QColor(data['color']), QColor(data['text_color']))
         if color_dialog.exec() == QDialog.DialogCode.Accepted:
             self.favorite_tickers[ticker]['color'] = color_dialog.bg_color.name()
             self.favorite_tickers[ticker]['text_color'] = color_dialog.fg_color.name()
             self.update_favorites_list()
-            self.save_favorite_tickers()
-            if self.floating_window and self.ticker == ticker:
-                self.update_floating_window()
+            self.save_settings()
+            self.prewarm_icons()
+            self.restyle(ticker)
 
-    def save_favorite_changes(self, ticker, low_threshold, high_threshold, dialog):
+    def save_favorite_changes(self, ticker, low_threshold, high_threshold, dialog, move_percent="", move_window="", stream=False, lots=""):
         try:
+            lots = parse_lots(lots)
             self.favorite_tickers[ticker]['low_threshold'] = float(low_threshold) if low_threshold else None
             self.favorite_tickers[ticker]['high_threshold'] = float(high_threshold) if high_threshold else None
-            self.save_favorite_tickers()
-            if self.floating_window and self.ticker == ticker:
-                self.update_floating_window()
+            self.favorite_tickers[ticker]['move_percent'] = float(move_percent) if move_percent else None
+            self.favorite_tickers[ticker]['move_window'] = float(move_window) if move_window else 60
+            self.favorite_tickers[ticker]['stream'] = stream
+            self.favorite_tickers[ticker]['lots'] = lots
+            self.save_settings()
+            self.update_alert_rules()
+            self.update_stream()
+            self.update_holdings()
             dialog.accept()
-        except ValueError:
-            print("Invalid input. Please enter numeric values.")
+        except ValueError as e:
+            print(f"Invalid input. Please enter numeric values. ({e})")
+            metrics.error('settings', f"invalid input for {ticker}: {e}")
 
     def tray_icon_activated(self, reason):
         if reason == QSystemTrayIcon.ActivationReason.Trigger:
             tickers = list(self.favorite_tickers.keys())
-            current_index = tickers.index(self.ticker)
+            if not tickers:
+                return
+            current_index = tickers.index(self.ticker) if self.ticker in tickers else -1
             next_index = (current_index + 1) % len(tickers)
             self.ticker = tickers[next_index]
-            self.ticker_input.setText(self.ticker)
-            self.update_price()
-            self.update_floating_window()
+            if self.settings_built:
+                self.ticker_input.setText(self.ticker)
+            self.show_ticker()
         elif reason == QSystemTrayIcon.ActivationReason.Context:
             self.show_menu()
 
@@ -360,6 +462,8 @@ class CryptoTicker(QWidget):
         about_dialog.exec()
 
     def update_favorites_list(self):
+        if not self.settings_built:
+            return
         self.favorites_list.clear()
         for ticker, data in self.favorite_tickers.items():
             item = QListWidgetItem(ticker)
@@ -367,97 +471,513 @@ class CryptoTicker(QWidget):
             self.favorites_list.addItem(item)
 
     def update_ticker(self):
-        self.ticker = self.ticker_input.text().lower()
-        self.update_price()
+        ticker = self.catalog.resolve(self.ticker_input.text())
+        if ticker != self.ticker:
+            self.low_threshold = None
+            self.high_threshold = None
+        self.ticker = ticker
+        if self.ticker != self.ticker_input.text():
+            self.ticker_input.setText(self.ticker)
+        self.show_ticker()
+
+    def load_catalog(self):
+        # the ~15k coin index is built once someone starts typing a ticker, or right after
+        # startup when an exchange or the stream needs it to map ids to symbols
+        if self.catalog.loaded or self.catalog_task is not None:
+            return
+        self.catalog_task = BackgroundTask(self.catalog.load)
+        self.catalog_task.signals.done.connect(self.on_catalog_loaded)
+        self.catalog_task.signals.failed.connect(self.on_catalog_failed)
+        QThreadPool.globalInstance().start(self.catalog_task)
+
+    def on_catalog_loaded(self, catalog):
+        self.catalog_task = None
+        if self.settings_built and self.ticker_input.hasFocus():
+            self.search_catalog(self.ticker_input.text())
+
+    def on_catalog_failed(self, error):
+        self.catalog_task = None
+        print(f"Could not load the coin list: {error}")
+        metrics.error('catalog', error)
+
+    def search_catalog(self, text):
+        if not self.catalog.loaded:
+            self.load_catalog()
+            return
+        self.search_model.clear()
+        for (coin_id, symbol, name), tier in self.catalog.search(text):
+            price = self.price_table.get(coin_id)
+            label = f"{symbol.upper()}  {name} ({coin_id})"
+            if price is not None:
+                label += f"  {self.format_money(price, coin_id)}"
+            item = QStandardItem(label)
+            item.setData(coin_id, Qt.ItemDataRole.UserRole)
+            self.search_model.appendRow(item)
+        if self.search_model.rowCount():
+            self.ticker_completer.complete()
+
+    def start_markets(self):
+        # last session's snapshot is shown until the next one arrives
+        self.movers.load()
+        age_ms = (time.time() - self.movers.updated) * 1000 if self.movers.updated else None
+        if age_ms is None or age_ms >= MARKETS_INTERVAL_MS:
+            self.markets_timer.start(MARKETS_START_DELAY_MS)
+        else:
+            self.markets_timer.start(int(MARKETS_INTERVAL_MS - age_ms))
+
+    def refresh_markets(self):
+        if self.movers_task is not None:
+            return
+        self.movers_task = BackgroundTask(self.movers.download)
+        self.movers_task.signals.done.connect(self.on_markets_loaded)
+        self.movers_task.signals.failed.connect(self.on_markets_failed)
+        QThreadPool.globalInstance().start(self.movers_task)
+
+    def on_markets_loaded(self, snapshot):
+        self.movers_task = None
+        self.movers.update(*snapshot)
+        self.movers.save()
+        self.markets_timer.start(MARKETS_INTERVAL_MS)
+        if self.movers_panel and self.movers_panel.isVisible():
+            self.movers_panel.refresh()
+
+    def on_markets_failed(self, error):
+        self.movers_task = None
+        self.markets_timer.start(MARKETS_RETRY_MS)
+        print(f"Could not load the market snapshot: {error}")
+        metrics.error('markets', error)
+
+    def show_movers(self):
+        # never fetches, the panel shows whatever the last snapshot was
+        if self.movers_panel is None:
+            from movers_panel import MoversPanel
+            self.movers_panel = MoversPanel(self.movers, self.format_money)
+            self.movers_panel.setWindowIcon(self.custom_icon)
+        self.movers_panel.refresh()
+        self.movers_panel.show()
+
+    def show_diagnostics(self):
+        if self.diagnostics_panel is None:
+            from diagnostics_panel import DiagnosticsPanel
+            self.diagnostics_panel = DiagnosticsPanel(self.price_fetcher.stats)
+            self.diagnostics_panel.setWindowIcon(self.custom_icon)
+        self.diagnostics_panel.show()
+
+    def show_ticker(self):
+        self.save_settings(ticker=self.ticker)
+        self.show_thresholds()
+        self.update_alert_rules()
+        # favorites are already in the price table, only unknown tickers need a fetch
+        if self.ticker in self.price_table:
+            self.show_price()
+        else:
+            self.price_action.setText(f"Loading {self.ticker}...")
+            self.scheduler.request_now()
         self.update_floating_window()
+        self.update_strip_tickers()  # only follows the active ticker while there are no favorites
+
+    def request_cost(self):
+        return len(self.price_fetcher.chunk_ids(self.watched_tickers()))
+
+    def watched_tickers(self):
+        return list(dict.fromkeys([self.ticker, *self.favorite_tickers.keys(), *self.pinned_windows]))
 
     def update_interval(self):
         self.interval = self.interval_slider.value()
         self.slider_value_label.setText(f"Interval: {self.interval} seconds")
-        self.timer.setInterval(self.interval * 1000)    
+        self.scheduler.set_interval(self.interval)
+        self.save_settings(interval=self.interval)
+
+    def update_scheduler_status(self):
+        if not self.settings_built:
+            return
+        status = self.scheduler.status()
+        text = (f"Requests: {status['requests_per_minute']}/{status['rate_limit']} per min · "
+                f"Budget: {status['budget']:.1f}/{status['capacity']} · "
+                f"Polling every {status['interval']:.0f}s")
+        if status['backoff'] > 0:
+            text += f" · Backing off {status['backoff']:.0f}s (attempt {status['attempts']})"
+        if self.price_stream is not None and self.price_stream.running:
+            text += f" · Stream: {self.stream_state}"
+        providers = self.price_fetcher.stats().get('providers')
+        if providers:
+            sources = []
+            for name, entry in providers.items():
+                state = f"resting {entry['resting']:.0f}s" if entry['resting'] else f"{entry['latency'] * 1000:.0f}ms"
+                sources.append(f"{name} {state}, {entry['error_rate'] * 100:.0f}% errors")
+            text += "\nSources: " + " · ".join(sources)
+        self.scheduler_status_label.setText(text)
 
     def update_thresholds(self):
         try:
-            self.low_threshold = float(self.low_threshold_input.text()) if self.low_threshold_input.text() else None
-            self.high_threshold = float(self.high_threshold_input.text()) if self.high_threshold_input.text() else None
+            low_threshold = float(self.low_threshold_input.text()) if self.low_threshold_input.text() else None
+            high_threshold = float(self.high_threshold_input.text()) if self.high_threshold_input.text() else None
         except ValueError:
             print("Invalid threshold value. Please enter numeric values.")
+            metrics.error('settings', "invalid threshold value")
+            return
+        if self.ticker in self.favorite_tickers:
+            self.favorite_tickers[self.ticker]['low_threshold'] = low_threshold
+            self.favorite_tickers[self.ticker]['high_threshold'] = high_threshold
+            self.save_settings()
+        else:
+            self.low_threshold = low_threshold
+            self.high_threshold = high_threshold
+        self.update_alert_rules()
+
+    def show_thresholds(self):
+        if not self.settings_built:
+            return
+        data = self.favorite_tickers.get(self.ticker, {})
+        low_threshold = data.get('low_threshold') if data else self.low_threshold
+        high_threshold = data.get('high_threshold') if data else self.high_threshold
+        self.low_threshold_input.setText(str(low_threshold) if low_threshold is not None else "")
+        self.high_threshold_input.setText(str(high_threshold) if high_threshold is not None else "")
 
     def update_price(self):
-        try:
-            response = requests.get(f"https://api.coingecko.com/api/v3/simple/price?ids={self.ticker}&vs_currencies=usd")
-            data = response.json()
-            self.current_price = data[self.ticker]['usd']
-
-            if self.previous_price is not None:
-                change = self.current_price - self.previous_price
-                percent_change = (change / self.previous_price) * 100
-                arrow = "↑" if change >= 0 else "↓"
-                change_text = f" {arrow} {abs(percent_change):.2f}%"
-            else:
-                change_text = ""
-
-            price_text = f"{self.ticker.capitalize()}: ${self.current_price:.2f}{change_text}"
-            self.price_action.setText(price_text)
-            self.tray_icon.setToolTip(price_text)
-
-            if self.floating_window and self.floating_window.isVisible():
-                self.floating_window.update_price(price_text)
-
-            if self.ticker in self.favorite_tickers:
-                data = self.favorite_tickers[self.ticker]
-                if data['low_threshold'] is not None and self.current_price <= data['low_threshold']:
-                    self.set_icon_color(data['color'], 0.5)
-                elif data['high_threshold'] is not None and self.current_price >= data['high_threshold']:
-                    self.set_icon_color(data['color'], 1)
-                else:
-                    self.set_icon_color(data['color'], 0.2)
+        # a newer request supersedes whatever is still in flight
+        self.fetch_worker.request(self.watched_tickers())
+
+    def on_prices_ready(self, prices):
+        self.scheduler.on_success()
+        self.apply_prices(prices)
+        if self.ticker not in self.price_table:
+            self.show_price()  # asked for but not priced, e.g. an id the API doesn't know
+
+    @metrics.timed('ui.apply_prices')
+    def apply_prices(self, prices, timestamp=None):
+        # polled and streamed prices both land here
+        now = timestamp or time.time()
+        self.price_table.update(prices, now)
+        self.price_history.append_many(prices, now)
+        self.price_cache.record(self.price_table, prices)
+        if not self.cache_timer.isActive():
+            self.cache_timer.start()  # streaming updates collapse into one write every few seconds
+        rates = self.quotes.update(self.price_fetcher.take_quotes(), now)
+        if rates:
+            self.price_cache.record_rates(self.quotes, rates)
+        held = self.portfolio.update(prices)  # only the coins in this update are revalued
+        if self.board:
+            self.board.publish(prices)  # one signal for every floating window and the strip
+        if self.ticker in prices or ((held or self.currency in rates) and self.ticker in self.price_table):
+            self.show_price()
+        self.notify_alerts(self.alert_engine.evaluate(self.price_table.prices, self.price_history))
+
+    def on_stream_state(self, state):
+        self.stream_state = state
+        self.update_scheduler_status()
+
+    def update_stream(self):
+        tickers = [ticker for ticker, data in self.favorite_tickers.items() if data.get('stream')]
+        if self.price_stream is None:
+            if not tickers:
+                return  # QtWebSockets is only loaded once a favorite asks for live prices
+            from price_stream import PriceStream, STREAM_URL
+            self.price_stream = PriceStream(self.stream_url or STREAM_URL,
+                                            symbol_lookup=lambda ticker: self.catalog.symbol(ticker), parent=self)
+            self.price_stream.prices_ready.connect(self.apply_prices)
+            self.price_stream.state_changed.connect(self.on_stream_state)
+            self.load_catalog()
+        self.price_stream.set_tickers(tickers)
+
+    def update_alert_rules(self):
+        rules = favorite_rules(self.favorite_tickers)
+        if self.ticker not in self.favorite_tickers:
+            # the settings window thresholds apply to a ticker that isn't a favorite
+            if self.low_threshold is not None:
+                rules.append((self.ticker, BELOW, self.low_threshold, 0))
+            if self.high_threshold is not None:
+                rules.append((self.ticker, ABOVE, self.high_threshold, 0))
+        self.alert_engine.set_rules(rules)
+
+    def notify_alerts(self, alerts):
+        if alerts:
+            # one notification per batch, however many rules crossed at once
+            self.tray_icon.showMessage("CoinWatcher", "\n".join(alert_text(alert) for alert in alerts),
+                                       QSystemTrayIcon.MessageIcon.Information, 10000)
+
+    def on_fetch_failed(self, error):
+        metrics.error('fetch', error)
+        self.scheduler.on_failure()
+        self.show_error(error)
+
+    def on_rate_limited(self, retry_after):
+        metrics.error('fetch', f"rate limited, Retry-After {retry_after:.0f}s")
+        self.scheduler.on_rate_limited(retry_after)
+        self.show_error(f"rate limited, retrying in {self.scheduler.backoff.remaining():.0f}s")
+
+    def price_text(self, ticker, error=None):
+        price = self.price_table.get(ticker)
+        if price is None:
+            return f"Loading {ticker}..."
+
+        # measured against the price one poll interval back, whether the coin is polled or
+        # streamed; the history outlives failed requests and restarts, the table only this session
+        latest = self.price_history.latest(ticker)
+        previous = latest and self.price_history.price_near(ticker, latest[0] - self.scheduler.effective_interval())
+        previous_price = previous[1] if previous and previous[0] < latest[0] else self.price_table.get_previous(ticker)
+        if previous_price:
+            change = price - previous_price
+            percent_change = (change / previous_price) * 100
+            arrow = "↑" if change >= 0 else "↓"
+            change_text = f" {arrow} {abs(percent_change):.2f}%"
+        else:
+            change_text = ""
+
+        price_text = f"{ticker.capitalize()}: {self.format_money(price, ticker)}{change_text}"
+        # a price restored from the last run shows its age until a live one replaces it
+        age = self.price_table.age(ticker)
+        if error or self.price_table.is_cached(ticker) or age > 2 * self.scheduler.effective_interval():
+            price_text += f" · {format_age(age)} ago"
+        return price_text
+
+    @metrics.timed('ui.show_price')
+    def show_price(self, error=None):
+        self.current_price = self.price_table.get(self.ticker)
+        if self.current_price is None:
+            self.show_error(f"no price for '{self.ticker}'")
+            return
+        if error != self.offline_error:
+            self.offline_error = error
+            if self.board:
+                self.board.publish()  # every window shows its price's age while offline
+
+        price_text = self.price_text(self.ticker, error)
+        self.price_action.setText(price_text)
+        tooltip_lines = [price_text, *self.portfolio_lines(self.portfolio.value)]
+        if error:
+            tooltip_lines.append(f"Offline: {error}")
+        self.tray_icon.setToolTip("\n".join(tooltip_lines))
+
+        if self.ticker in self.favorite_tickers:
+            data = self.favorite_tickers[self.ticker]
+            if data['low_threshold'] is not None and self.current_price <= data['low_threshold']:
+                self.set_icon_color(data['color'], LOW_OPACITY)
+            elif data['high_threshold'] is not None and self.current_price >= data['high_threshold']:
+                self.set_icon_color(data['color'], HIGH_OPACITY)
             else:
-                self.set_icon_color("default")
-
-            self.previous_price = self.current_price
+                self.set_icon_color(data['color'], NORMAL_OPACITY)
+        else:
+            self.set_icon_color("default")
+
+    def show_error(self, error):
+        if self.ticker in self.price_table:
+            # keep the last good price on screen with its age rather than the error
+            self.show_price(error)
+            return
+        error_text = f"Error: {str(error)}"
+        self.price_action.setText(error_text)
+        self.tray_icon.setToolTip("CoinWatcher")
 
-        except Exception as e:
-            error_text = f"Error: {str(e)}"
-            self.price_action.setText(error_text)
-            self.tray_icon.setToolTip("CoinWatcher")
-            self.current_price = None
-            self.previous_price = None
+    def update_holdings(self):
+        # lots changed, the only time they are summed again
+        self.portfolio.set_holdings(self.favorite_tickers, self.price_table.prices)
+        if self.board:
+            self.board.publish()
+        if self.ticker in self.price_table:
+            self.show_price()
+
+    def holding_line(self, ticker):
+        holding = self.portfolio.holding(ticker)
+        if holding is None:
+            return None
+        quantity, value, cost = holding
+        return f"{quantity:,.12g} {ticker.capitalize()}: {pnl_text(value, cost, self.format_money)}"
+
+    def total_line(self):
+        return f"Portfolio: {pnl_text(*self.portfolio.totals(), self.format_money)}"
+
+    def portfolio_lines(self, tickers):
+        lines = [line for line in map(self.holding_line, tickers) if line]
+        if len(self.portfolio.value) > 1 or (self.portfolio.value and not lines):
+            lines.append(self.total_line())
+        return lines
+
+    def board_text(self, ticker):
+        # what a floating window or the strip shows for a ticker
+        return "\n".join([self.price_text(ticker, self.offline_error), *filter(None, [self.holding_line(ticker)])])
+
+    def board_total(self):
+        return self.total_line() if len(self.portfolio.value) > 1 else ""
+
+    def ticker_colors(self, ticker):
+        from ticker_board import DEFAULT_BACKGROUND, DEFAULT_TEXT_COLOR
+        data = self.favorite_tickers.get(ticker)
+        if data:
+            return data['color'], data.get('text_color', DEFAULT_TEXT_COLOR)
+        return DEFAULT_BACKGROUND, DEFAULT_TEXT_COLOR
+
+    def ticker_board(self):
+        # built along with the first floating window or strip, then shared by all of them
+        if self.board is None:
+            from ticker_board import TickerBoard
+            self.board = TickerBoard(self.price_table, self.board_text, self.board_total, self.ticker_colors, self)
+        return self.board
+
+    def restyle(self, ticker):
+        if self.board:
+            self.board.restyle([ticker])
+
+    def format_money(self, usd_value, ticker=None):
+        # a ticker's own quote when there is one, otherwise converted at the cached cross-rate
+        if ticker is not None:
+            value = self.quotes.price(ticker, self.currency, usd_value)
+        else:
+            value = self.quotes.convert(usd_value, self.currency)
+        if value is None:
+            return format_price(usd_value)  # no rate for that currency yet, stay in USD
+        return format_price(value, self.currency)
+
+    def update_currency_menu(self):
+        self.currency_menu.clear()
+        if self.currency_group is not None:
+            self.currency_group.deleteLater()
+        self.currency_group = QActionGroup(self.currency_menu)
+        for currency in self.quotes.currencies:
+            action = QAction(currency.upper(), self.currency_menu, checkable=True, checked=currency == self.currency)
+            action.triggered.connect(lambda checked, currency=currency: self.set_currency(currency))
+            self.currency_group.addAction(action)
+            self.currency_menu.addAction(action)
+
+    def set_currency(self, currency):
+        # only changes how prices are shown, the quotes are already here
+        self.currency = currency
+        self.save_settings(currency=currency)
+        if self.board:
+            self.board.publish()
+        if self.ticker in self.price_table:
+            self.show_price()
+
+    def update_currencies(self):
+        try:
+            currencies = parse_currencies(self.currencies_input.text())
+        except ValueError as e:
+            print(f"Invalid currency list: {e}")
+            metrics.error('settings', f"invalid currency list: {e}")
+            return
+        self.currencies_input.setText(", ".join(currencies))
+        if currencies == self.quotes.currencies:
+            return
+        self.quotes.set_currencies(currencies)
+        self.price_fetcher.set_quote_currencies(currencies)
+        if self.currency not in currencies:
+            self.currency = BASE_CURRENCY
+        self.save_settings(currencies=currencies, currency=self.currency)
+        self.update_currency_menu()
+        self.scheduler.request_now()  # the new currencies are quoted from the next request on
+        if self.board:
+            self.board.publish()
+        if self.ticker in self.price_table:
+            self.show_price()
+
+    def close_history(self):
+        self.price_history.compact_all()
+        self.price_history.close()
+
+    def prewarm_icons(self):
+        self.icon_cache.prewarm(data['color'] for data in self.favorite_tickers.values())
 
     def set_icon_color(self, color, opacity=1):
+        # every setIcon is a StatusNotifier round trip on KDE, so skip it when nothing changed
+        key = "default" if color == "default" else self.icon_cache.key(color, opacity)
+        if key == self.icon_key:
+            return
+        started = metrics.start()
+        self.icon_key = key
         if color == "default":
             self.tray_icon.setIcon(self.custom_icon)
         else:
-            pixmap = QPixmap(self.icon_path)
-            painter = QPainter(pixmap)
-            painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_SourceIn)
-
-            qcolor = QColor(color)
-            qcolor.setAlphaF(opacity)
-
-            painter.fillRect(pixmap.rect(), qcolor)
-            painter.end()
-            colored_icon = QIcon(pixmap)
-            self.tray_icon.setIcon(colored_icon)
+            self.tray_icon.setIcon(self.icon_cache.get(color, opacity))
+        metrics.finish('icon.set', started)
 
     def update_floating_window(self):
         if self.floating_window:
-            if self.ticker in self.favorite_tickers:
-                data = self.favorite_tickers[self.ticker]
-                self.floating_window.set_background_color(data['color'])
-                self.floating_window.set_text_color(data.get('text_color', '#FFFFFF'))
-            else:
-                self.floating_window.set_background_color(QColor(75, 0, 130))
-                self.floating_window.set_text_color('#FFFFFF')
-            self.floating_window.update_price(self.price_action.text())
+            self.floating_window.set_ticker(self.ticker)
+
+    def update_chart(self, window=None):
+        window = window or self.floating_window
+        if window and window.chart:
+            from price_chart import CHART_SPAN
+            window.set_samples(self.price_history.samples(window.ticker, CHART_SPAN))
+
+    def create_floating_window(self, ticker, pinned=False):
+        from floating_window import FloatingPriceWindow
+        window = FloatingPriceWindow(self.ticker_board(), ticker, pinned=pinned, show_total=not pinned)
+        window.setWindowIcon(self.custom_icon)
+        window.chart_mode_changed.connect(lambda mode: self.update_chart(window))
+        window.pin_requested.connect(self.pin_window)
+        window.unpin_requested.connect(self.unpin_window)
+        return window
 
     def toggle_floating_window(self):
         if self.floating_window is None:
-            self.floating_window = FloatingPriceWindow()
-            self.floating_window.setWindowIcon(self.custom_icon)
-            self.update_floating_window()
-            self.floating_window.update_price(self.price_action.text())
+            self.floating_window = self.create_floating_window(self.ticker)
+            self.floating_window.moved.connect(lambda position: self.save_settings(floating_position=[position.x(), position.y()]))
+            position = self.settings.get('floating_position')
+            if position:
+                self.floating_window.move(QPoint(*position))
             self.floating_window.show()
         else:
             self.floating_window.setVisible(not self.floating_window.isVisible())
 
+    def pin_window(self, ticker, position=None, chart=''):
+        window = self.pinned_windows.get(ticker)
+        if window is None:
+            window = self.pinned_windows[ticker] = self.create_floating_window(ticker, pinned=True)
+            window.moved.connect(lambda position: self.save_pinned_windows())
+            window.chart_mode_changed.connect(lambda mode: self.save_pinned_windows())
+            window.move(QPoint(*position) if position else QCursor.pos())
+            if chart:
+                window.set_chart_mode(chart)
+            if ticker not in self.price_table:
+                self.scheduler.request_now()
+        window.show()
+        self.save_pinned_windows()
+
+    def unpin_window(self, ticker):
+        window = self.pinned_windows.pop(ticker, None)
+        if window:
+            window.close()
+            window.deleteLater()
+            self.save_pinned_windows()
+
+    def save_pinned_windows(self):
+        self.save_settings(pinned_windows=[{'ticker': ticker, 'position': [window.x(), window.y()],
+                                            'chart': window.chart.mode if window.chart else ''}
+                                           for ticker, window in self.pinned_windows.items()])
+
+    def update_pin_menu(self):
+        self.pin_menu.clear()
+        for ticker in dict.fromkeys([self.ticker, *self.favorite_tickers, *self.pinned_windows]):
+            action = QAction(ticker.capitalize(), self.pin_menu, checkable=True, checked=ticker in self.pinned_windows)
+            action.triggered.connect(lambda checked, ticker=ticker: self.pin_window(ticker) if checked else self.unpin_window(ticker))
+            self.pin_menu.addAction(action)
+
+    def strip_tickers(self):
+        return list(self.favorite_tickers) or [self.ticker]
+
+    def update_strip_tickers(self):
+        if self.ticker_strip:
+            self.ticker_strip.set_tickers(self.strip_tickers())
+
+    def set_ticker_strip(self, visible):
+        if visible and self.ticker_strip is None:
+            from ticker_strip import TickerStrip
+            self.ticker_strip = TickerStrip(self.ticker_board(), self.strip_tickers())
+            self.ticker_strip.setWindowIcon(self.custom_icon)
+            self.ticker_strip.moved.connect(lambda position: self.save_settings(strip_position=[position.x(), position.y()]))
+            self.ticker_strip.close_requested.connect(lambda: self.set_ticker_strip(False))
+            position = self.settings.get('strip_position')
+            if position:
+                self.ticker_strip.move(QPoint(*position))
+        if self.ticker_strip:
+            self.ticker_strip.setVisible(visible)
+        self.strip_action.setChecked(visible)
+        self.save_settings(strip_visible=visible)
+
+    def restore_windows(self):
+        # last session's pinned windows and strip, once the tray is up
+        for entry in self.settings.get('pinned_windows'):
+            self.pin_window(entry['ticker'], entry.get('position'), entry.get('chart', ''))
+        if self.settings.get('strip_visible'):
+            self.set_ticker_strip(True)
@@ -0,0 +1,89 @@
+import math
+import time
+
+BASE_CURRENCY = 'usd'  # what the price table, history, alerts and holdings are kept in
+DEFAULT_CURRENCIES = ['usd', 'eur', 'btc', 'eth']
+SYMBOLS = {'usd': '$', 'eur': '€', 'gbp': '£', 'jpy': '¥', 'cny': '¥', 'krw': '₩', 'inr': '₹',
+           'btc': '₿', 'eth': 'Ξ'}
+SIGNIFICANT_DIGITS = 4  # shown for prices below 1, e.g. SHIB at $0.00001923
+
+
+def parse_currencies(text):
+    # "usd, EUR btc" -> ['usd', 'eur', 'btc'], always starting with the base currency
+    currencies = [BASE_CURRENCY]
+    for code in text.replace(',', ' ').lower().split():
+        if not code.isalnum():
+            raise ValueError(f"'{code}' is not a currency code")
+        if code not in currencies:
+            currencies.append(code)
+    return currencies
+
+
+def format_price(value, currency=BASE_CURRENCY):
+    magnitude = abs(value)
+    if magnitude >= 1 or magnitude == 0:
+        decimals = 2
+    else:
+        decimals = min(SIGNIFICANT_DIGITS - 1 - math.floor(math.log10(magnitude)), 12)
+    text = f"{value:,.{decimals}f}"
+    symbol = SYMBOLS.get(currency)
+    return f"{symbol}{text}" if symbol else f"{text} {currency.upper()}"
+
+
+def format_age(seconds):
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= size:
+            return f"{seconds // size:.0f}{unit}"
+    return f"{seconds:.0f}s"
+
+
+class QuoteMatrix:
+    # ticker x currency: the rows CoinGecko quoted directly, plus cross-rates (units per USD)
+    # derived from them, so any USD price can be shown in any currency without another request
+    def __init__(self, currencies=None):
+        self.set_currencies(currencies or [BASE_CURRENCY])
+        self.rates = {BASE_CURRENCY: 1.0}
+        self.rates_updated = {}
+
+    def set_currencies(self, currencies):
+        self.currencies = list(currencies)
+        self.index = {currency: column for column, currency in enumerate(self.currencies)}
+        self.rows = {}  # ticker -> [price per currency, None where not quoted]
+        self.quoted = {}  # ticker -> USD price the row was quoted alongside
+
+    def seed_rates(self, rates):
+        for currency, (rate, updated) in rates.items():
+            if currency not in self.rates_updated:
+                self.rates[currency] = rate
+                self.rates_updated[currency] = updated
+
+    def update(self, quotes, timestamp=None):
+        # quotes: {ticker: {currency: price}}; returns the currencies whose rate moved
+        timestamp = timestamp or time.time()
+        changed = set()
+        for ticker, quote in quotes.items():
+            base = quote.get(BASE_CURRENCY)
+            if not base:
+                continue
+            self.rows[ticker] = [quote.get(currency) for currency in self.currencies]
+            self.quoted[ticker] = base
+            for currency, price in quote.items():
+                if currency != BASE_CURRENCY and price:
+                    rate = price / base
+                    if self.rates.get(currency) != rate:
+                        self.rates[currency] = rate
+                        changed.add(currency)
+                    self.rates_updated[currency] = timestamp
+        return changed
+
+    def convert(self, usd_value, currency):
+        rate = self.rates.get(currency)
+        return usd_value * rate if rate is not None else None
+
+    def price(self, ticker, currency, usd_price):
+        # the direct quote while the USD price is still the one it came with, else a conversion
+        row = self.rows.get(ticker)
+        column = self.index.get(currency)
+        if row is not None and column is not None and row[column] is not None and self.quoted[ticker] == usd_price:
+            return row[column]
+        return self.convert(usd_price, currency)
@@ -0,0 +1,112 @@
+import time
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QListWidget, QCheckBox, QPushButton,
+                             QTableWidget, QTableWidgetItem, QHeaderView, QFileDialog)
+from PyQt6.QtCore import Qt, QTimer
+import metrics
+
+REFRESH_MS = 1000
+COLUMNS = ("Timing", "Count", "p50 ms", "p99 ms", "Max ms")
+
+
+def format_ms(value):
+    return f"{value:.2f}" if value is not None else "-"
+
+
+class DiagnosticsPanel(QWidget):
+    # live view of the metrics module, refreshed only while it is on screen
+    def __init__(self, fetcher_stats=None, parent=None):
+        super().__init__(parent)
+        self.fetcher_stats = fetcher_stats
+        self.setWindowTitle("CoinWatcher Diagnostics")
+
+        layout = QVBoxLayout()
+        header = QHBoxLayout()
+        self.enabled_box = QCheckBox("Collect timings")
+        self.enabled_box.setChecked(metrics.enabled)
+        self.enabled_box.toggled.connect(self.set_enabled)
+        header.addWidget(self.enabled_box)
+        header.addStretch()
+        reset_button = QPushButton("Reset")
+        reset_button.clicked.connect(self.reset)
+        header.addWidget(reset_button)
+        save_button = QPushButton("Save JSON...")
+        save_button.clicked.connect(self.save_json)
+        header.addWidget(save_button)
+        layout.addLayout(header)
+
+        self.timings_table = QTableWidget(0, len(COLUMNS))
+        self.timings_table.setHorizontalHeaderLabels(COLUMNS)
+        self.timings_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.timings_table.verticalHeader().setVisible(False)
+        self.timings_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.timings_table.setMinimumSize(480, 220)
+        layout.addWidget(self.timings_table)
+
+        lists = QHBoxLayout()
+        self.lists = {}
+        for title in ("Counters", "Recent Errors"):
+            column = QVBoxLayout()
+            column.addWidget(QLabel(title))
+            self.lists[title] = QListWidget()
+            column.addWidget(self.lists[title])
+            lists.addLayout(column, 1 if title == "Counters" else 2)
+        layout.addLayout(lists)
+
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.hide)
+        layout.addWidget(close_button)
+        self.setLayout(layout)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(REFRESH_MS)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        self.refresh()
+        self.refresh_timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.refresh_timer.stop()
+        super().hideEvent(event)
+
+    def set_enabled(self, on):
+        metrics.enable(on)
+        self.refresh()
+
+    def reset(self):
+        metrics.reset()
+        self.refresh()
+
+    def save_json(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save Metrics", "coinwatcher-metrics.json", "JSON (*.json)")
+        if path:
+            metrics.dump(path)
+
+    def refresh(self):
+        snapshot = metrics.snapshot()
+        timings = snapshot['timings']
+        self.timings_table.setRowCount(len(timings))
+        for row, (name, summary) in enumerate(timings.items()):
+            cells = (name, str(summary['count']), format_ms(summary['p50_ms']),
+                     format_ms(summary['p99_ms']), format_ms(summary['max_ms']))
+            for column, text in enumerate(cells):
+                item = QTableWidgetItem(text)
+                if column:
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                self.timings_table.setItem(row, column, item)
+
+        counters = self.lists["Counters"]
+        counters.clear()
+        for name, value in snapshot['counters'].items():
+            counters.addItem(f"{name}: {value}")
+        if self.fetcher_stats:
+            for name, value in self.fetcher_stats().items():
+                if isinstance(value, (int, float)):
+                    counters.addItem(f"fetcher.{name}: {value}")
+
+        errors = self.lists["Recent Errors"]
+        errors.clear()
+        for entry in reversed(snapshot['errors']):
+            errors.addItem(f"{time.strftime('%H:%M:%S', time.localtime(entry['time']))} "
+                           f"[{entry['source']}] {entry['message']}")
@@ -0,0 +1,114 @@
+import threading
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from price_fetcher import RateLimited
+import metrics
+
+
+class FetchSignals(QObject):
+    finished = pyqtSignal(int, dict)
+    failed = pyqtSignal(int, str)
+    rate_limited = pyqtSignal(int, float)
+
+
+class TaskSignals(QObject):
+    done = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+
+class BackgroundTask(QRunnable):
+    # one-off job (catalog loads and the like) whose result comes back by signal
+    def __init__(self, fn, *args):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.signals = TaskSignals()
+
+    def run(self):
+        try:
+            result = self.fn(*self.args)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.done.emit(result)
+
+
+class FetchTask(QRunnable):
+    def __init__(self, fetcher, tickers, generation, signals):
+        super().__init__()
+        self.fetcher = fetcher
+        self.tickers = tickers
+        self.generation = generation
+        self.signals = signals
+        self.cancelled = threading.Event()
+
+    def run(self):
+        started = metrics.start()
+        try:
+            prices = self.fetcher.fetch(self.tickers, cancelled=self.cancelled)
+        except RateLimited as e:
+            metrics.count('fetch.rate_limited')
+            if not self.cancelled.is_set():
+                self.signals.rate_limited.emit(self.generation, e.retry_after or 0.0)
+            return
+        except Exception as e:
+            metrics.count('fetch.failed')
+            if not self.cancelled.is_set():
+                self.signals.failed.emit(self.generation, str(e))
+            return
+        metrics.finish('fetch', started)
+        metrics.count('fetch.ok')
+        if not self.cancelled.is_set():
+            self.signals.finished.emit(self.generation, prices)
+
+
+class FetchWorker(QObject):
+    # runs PriceFetcher.fetch on a pool thread so the GUI thread never waits on HTTP
+    prices_ready = pyqtSignal(dict)
+    fetch_failed = pyqtSignal(str)
+    rate_limited = pyqtSignal(float)
+
+    def __init__(self, fetcher, parent=None):
+        super().__init__(parent)
+        self.fetcher = fetcher
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(2)  # a superseded request may still be draining
+        self.generation = 0
+        self.current_task = None
+        self.signals = FetchSignals()
+        self.signals.finished.connect(self.on_finished)
+        self.signals.failed.connect(self.on_failed)
+        self.signals.rate_limited.connect(self.on_rate_limited)
+
+    def request(self, tickers):
+        self.cancel()
+        self.current_task = FetchTask(self.fetcher, list(tickers), self.generation, self.signals)
+        self.pool.start(self.current_task)
+
+    def cancel(self):
+        # anything still in flight belongs to an older generation and will be dropped
+        self.generation += 1
+        if self.current_task is not None:
+            self.current_task.cancelled.set()
+            self.current_task = None
+        self.pool.clear()
+
+    def is_busy(self):
+        return self.current_task is not None
+
+    def on_finished(self, generation, prices):
+        if generation != self.generation:
+            return
+        self.current_task = None
+        self.prices_ready.emit(prices)
+
+    def on_failed(self, generation, error):
+        if generation != self.generation:
+            return
+        self.current_task = None
+        self.fetch_failed.emit(error)
+
+    def on_rate_limited(self, generation, retry_after):
+        if generation != self.generation:
+            return
+        self.current_task = None
+        self.rate_limited.emit(retry_after)
@@ -1,20 +1,35 @@
 import os
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel
-from PyQt6.QtGui import QIcon, QPainter, QColor, QFontMetrics
-from PyQt6.QtCore import Qt, QPoint, QSize
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QMenu
+from PyQt6.QtGui import QIcon, QPainter, QAction, QActionGroup
+from PyQt6.QtCore import Qt, QPoint, QSize, pyqtSignal
+from price_chart import PriceChart, SPARKLINE, CANDLES
+import metrics
 
 class FloatingPriceWindow(QWidget):
-    def __init__(self, parent=None):
+    chart_mode_changed = pyqtSignal(str)
+    moved = pyqtSignal(QPoint)
+    pin_requested = pyqtSignal(str)
+    unpin_requested = pyqtSignal(str)
+
+    def __init__(self, board, ticker=None, pinned=False, show_total=False, parent=None):
         super().__init__(parent)
         self.setWindowFlags(Qt.WindowType.FramelessWindowHint | Qt.WindowType.WindowStaysOnTopHint)
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
-        
-        self.background_color = QColor(75, 0, 130, 204)  # Default color
-        self.text_color = QColor(255, 255, 255)  # Default text color (white)
+
+        # a pinned window keeps its ticker, the other one follows whatever ticker is active
+        self.board = board
+        self.ticker = ticker
+        self.pinned = pinned
+        self.show_total = show_total
+        self.ticker_style = None
+        self.text = None
+        self.sample_time = None
+
+        self.chart = None
 
         layout = QVBoxLayout()
         self.price_label = QLabel()
-        self.price_label.setStyleSheet(f"color: {self.text_color.name()}; font-size: 16px;")
+        self.price_label.setFont(board.font)
         self.price_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         layout.addWidget(self.price_label)
 
@@ -25,13 +40,67 @@ class FloatingPriceWindow(QWidget):
 
         # Set the window icon
         self.setWindowIcon(QIcon(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'coin.png')))
+        board.updated.connect(self.refresh)
+
+    def set_ticker(self, ticker):
+        if ticker != self.ticker:
+            self.ticker = ticker
+            self.sample_time = None
+            if self.chart:
+                self.chart_mode_changed.emit(self.chart.mode)  # the new ticker's history
+        self.refresh()
+
+    @metrics.timed('floating.update')
+    def refresh(self, tickers=None):
+        # runs for every board update, so it only redoes what changed for this window
+        if self.ticker is None or (tickers is not None and self.ticker not in tickers and not self.show_total):
+            return
+        if self.chart:
+            sample = self.board.sample(self.ticker)
+            if sample and sample[0] != self.sample_time:
+                self.sample_time = sample[0]
+                self.chart.add_sample(*sample)
+        if not self.isVisible():
+            return  # showEvent catches up
+        style = self.board.style(self.ticker)
+        if style is not self.ticker_style:
+            self.ticker_style = style
+            self.price_label.setStyleSheet(style.stylesheet)
+            if self.chart:
+                self.chart.set_line_color(style.text_color)
+            self.update()
+        text = self.board.text(self.ticker)
+        total = self.board.total() if self.show_total else ""
+        if total:
+            text += "\n" + total
+        if text != self.text:
+            self.text = text
+            self.price_label.setText(text)
+            self.fit()
 
+    def fit(self):
+        # text sizes come from the board's cache instead of a layout pass per price
+        if self.text is None:
+            return
+        text_size = self.board.text_size(self.text)
+        width, height = text_size.width(), text_size.height()
+        if self.chart:
+            width = max(width, self.chart.width())
+            height += self.chart.height() + self.layout().spacing()
+        size = QSize(width + 40, height + 20)  # Add some padding
+        if size != self.size():
+            self.setFixedSize(size)
+
+    def showEvent(self, event):
+        self.refresh()
+        super().showEvent(event)
+
+    @metrics.timed('floating.paint')
     def paintEvent(self, event):
+        if self.ticker_style is None:
+            return
         painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        painter.setBrush(self.background_color)
-        painter.setPen(Qt.PenStyle.NoPen)
-        painter.drawRoundedRect(self.rect(), 10, 10)
+        painter.drawPixmap(0, 0, self.board.background(self.ticker_style.background, self.size(), self.devicePixelRatioF()))
 
     def mousePressEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
@@ -44,27 +113,47 @@ class FloatingPriceWindow(QWidget):
 
     def mouseReleaseEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
+            if self.dragging:
+                self.moved.emit(self.pos())
             self.dragging = False
 
-    def update_price(self, price_text):
-        self.price_label.setText(price_text)
-        self.adjustSize()
-
-    def set_background_color(self, color, opacity=0.8):
-        self.background_color = QColor(color)
-        self.background_color.setAlphaF(opacity)
-        self.update()
-
-    def set_text_color(self, color):
-        self.text_color = QColor(color)
-        self.price_label.setStyleSheet(f"color: {self.text_color.name()}; font-size: 16px;")
+    def contextMenuEvent(self, event):
+        menu = QMenu(self)
+        group = QActionGroup(menu)
+        current = self.chart.mode if self.chart else ''
+        for label, mode in (("No Chart", ''), ("Sparkline", SPARKLINE), ("Candles", CANDLES)):
+            action = QAction(label, menu, checkable=True, checked=mode == current)
+            action.triggered.connect(lambda checked, mode=mode: self.set_chart_mode(mode))
+            group.addAction(action)
+            menu.addAction(action)
+        if self.ticker:
+            menu.addSeparator()
+            if self.pinned:
+                menu.addAction("Unpin").triggered.connect(lambda: self.unpin_requested.emit(self.ticker))
+            else:
+                menu.addAction(f"Pin {self.ticker.capitalize()}").triggered.connect(
+                    lambda: self.pin_requested.emit(self.ticker))
+        menu.exec(event.globalPos())
 
-    def sizeHint(self):
-        fm = QFontMetrics(self.price_label.font())
-        text_width = fm.horizontalAdvance(self.price_label.text())
-        text_height = fm.height()
-        return QSize(text_width + 40, text_height + 20)  # Add some padding
+    def set_chart_mode(self, mode, samples=()):
+        if not mode:
+            if self.chart:
+                self.layout().removeWidget(self.chart)
+                self.chart.deleteLater()
+                self.chart = None
+        elif self.chart is None:
+            self.chart = PriceChart(mode)
+            if self.ticker_style:
+                self.chart.set_line_color(self.ticker_style.text_color)
+            self.layout().addWidget(self.chart, alignment=Qt.AlignmentFlag.AlignHCenter)
+            self.chart.set_samples(samples)
+        else:
+            self.chart.set_mode(mode, samples)
+        self.fit()
+        self.chart_mode_changed.emit(mode)
 
-    def adjustSize(self):
-        super().adjustSize()
-        self.setFixedSize(self.sizeHint())
\ No newline at end of file
+    def set_samples(self, samples):
+        if self.chart:
+            self.chart.set_samples(samples)
+            if samples:
+                self.sample_time = samples[-1][0]
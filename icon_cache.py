@@ -0,0 +1,62 @@
+from collections import OrderedDict
+from PyQt6.QtGui import QIcon, QPixmap, QColor, QPainter
+from PyQt6.QtCore import Qt
+
+ICON_CACHE_SIZE = 32
+# tray icon opacity for a favorite below its low threshold, above its high one, and in between
+LOW_OPACITY = 0.5
+HIGH_OPACITY = 1
+NORMAL_OPACITY = 0.2
+THRESHOLD_OPACITIES = (LOW_OPACITY, HIGH_OPACITY, NORMAL_OPACITY)
+
+
+class IconCache:
+    # tinted tray icons keyed by (color, opacity, size), least recently used evicted first
+    def __init__(self, icon_path, max_entries=ICON_CACHE_SIZE):
+        self.icon_path = icon_path
+        self.max_entries = max_entries
+        self.source = None
+        self.icons = OrderedDict()
+
+    def key(self, color, opacity=1, size=None):
+        return (QColor(color).name(), float(opacity), size)
+
+    def source_pixmap(self):
+        if self.source is None:
+            self.source = QPixmap(self.icon_path)
+        return self.source
+
+    def render(self, color, opacity, size):
+        pixmap = self.source_pixmap()
+        if size is not None:
+            pixmap = pixmap.scaled(size, size, Qt.AspectRatioMode.KeepAspectRatio,
+                                   Qt.TransformationMode.SmoothTransformation)
+        else:
+            pixmap = pixmap.copy()
+        painter = QPainter(pixmap)
+        painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_SourceIn)
+        qcolor = QColor(color)
+        qcolor.setAlphaF(opacity)
+        painter.fillRect(pixmap.rect(), qcolor)
+        painter.end()
+        return QIcon(pixmap)
+
+    def get(self, color, opacity=1, size=None):
+        key = self.key(color, opacity, size)
+        icon = self.icons.get(key)
+        if icon is None:
+            icon = self.render(color, opacity, size)
+            self.icons[key] = icon
+            while len(self.icons) > self.max_entries:
+                self.icons.popitem(last=False)
+        else:
+            self.icons.move_to_end(key)
+        return icon
+
+    def prewarm(self, colors, size=None):
+        # every favorite's three threshold states, growing the cache so they all fit
+        colors = list(dict.fromkeys(QColor(color).name() for color in colors))
+        self.max_entries = max(self.max_entries, len(colors) * len(THRESHOLD_OPACITIES))
+        for color in colors:
+            for opacity in THRESHOLD_OPACITIES:
+                self.get(color, opacity, size)
@@ -0,0 +1,173 @@
+import heapq
+import json
+import math
+import os
+import time
+from array import array
+from collections import deque
+from paths import cache_dir
+
+MARKETS_PAGES = 2  # 250 coins per page, by market cap
+PER_PAGE = 250
+WINDOWS = {'1h': 3600, '24h': 86400, '7d': 7 * 86400}
+VOLUME_HISTORY = 7 * 86400 + 7 * 3600  # the longest window plus the coarsest spacing, so it has a baseline
+NAN = float('nan')
+
+
+def history_spacing(age):
+    # snapshots are kept fine near now, where the 1h baseline comes from, and thinned with
+    # age for the 24h and 7d ones, which keeps markets.json small
+    if age < 2 * 3600:
+        return 0
+    if age < 26 * 3600:
+        return 3600
+    return 6 * 3600
+
+
+class MarketMovers:
+    # bulk /coins/markets snapshots kept as one array per field, indexed by a stable column
+    # per coin; movers are picked with heaps rather than sorting the whole market
+    def __init__(self, fetcher, path=None, pages=MARKETS_PAGES, allow_request=None):
+        self.fetcher = fetcher
+        self.path = path or os.path.join(cache_dir(), 'markets.json')
+        self.pages = pages
+        self.allow_request = allow_request or (lambda: True)
+        self.ids = []
+        self.columns = {}  # coin id -> column
+        self.symbols = []
+        self.names = []
+        self.price = array('d')
+        self.volume = array('d')
+        self.change = {window: array('d') for window in WINDOWS}
+        self.volume_history = deque()  # (timestamp, volumes by column at that time)
+        self.rows = []
+        self.updated = None
+
+    def load(self):
+        # the last snapshot plus the volume history behind the spike baselines
+        try:
+            with open(self.path, 'r') as f:
+                cached = json.load(f)
+            rows, timestamp = cached['rows'], cached['timestamp']
+            coins = cached.get('coins', [])
+            history = cached.get('volume_history', [])
+        except (OSError, ValueError, KeyError):
+            return self
+        columns = [self.column(*coin) for coin in coins]
+        for saved_timestamp, volumes in history:
+            restored = array('d', [NAN]) * len(self.ids)
+            for column, volume in zip(columns, volumes):
+                restored[column] = volume if volume is not None else NAN
+            self.volume_history.append((saved_timestamp, restored))
+        self.update(rows, timestamp)
+        return self
+
+    def save(self):
+        coins = [[coin_id, symbol, name] for coin_id, symbol, name in zip(self.ids, self.symbols, self.names)]
+        history = [[timestamp, [None if math.isnan(volume) else volume for volume in volumes]]
+                   for timestamp, volumes in self.volume_history]
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = self.path + '.tmp'
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump({'timestamp': self.updated, 'rows': self.rows, 'coins': coins, 'volume_history': history},
+                          f, separators=(',', ':'))
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Could not save the market snapshot: {e}")
+
+    def download(self):
+        # runs on a pool thread; only the fields the movers need are kept
+        rows = []
+        for page in range(1, self.pages + 1):
+            if not self.allow_request():
+                if rows:
+                    break
+                raise RuntimeError("no request budget left for the market snapshot")
+            data = self.fetcher.get_json(f"{self.fetcher.base_url}/coins/markets?vs_currency=usd"
+                                         f"&order=market_cap_desc&per_page={PER_PAGE}&page={page}"
+                                         f"&price_change_percentage={','.join(WINDOWS)}")
+            for coin in data:
+                rows.append([coin['id'], coin.get('symbol') or '', coin.get('name') or coin['id'],
+                             coin.get('current_price'), coin.get('total_volume'),
+                             *(coin.get(f"price_change_percentage_{window}_in_currency") for window in WINDOWS)])
+            if len(data) < PER_PAGE:
+                break
+        return rows, time.time()
+
+    def column(self, coin_id, symbol, name):
+        column = self.columns.get(coin_id)
+        if column is None:
+            column = self.columns[coin_id] = len(self.ids)
+            self.ids.append(coin_id)
+            self.symbols.append(symbol)
+            self.names.append(name)
+            for values in (self.price, self.volume, *self.change.values()):
+                values.append(NAN)
+        return column
+
+    def update(self, rows, timestamp):
+        # coins that dropped out of the snapshot are left as NaN and skipped by the picks
+        for values in (self.price, self.volume, *self.change.values()):
+            values[:] = array('d', [NAN]) * len(values)
+        for coin_id, symbol, name, price, volume, *changes in rows:
+            column = self.column(coin_id, symbol, name)
+            self.price[column] = price if price is not None else NAN
+            self.volume[column] = volume if volume is not None else NAN
+            for window, change in zip(WINDOWS, changes):
+                self.change[window][column] = change if change is not None else NAN
+        if not self.volume_history or timestamp > self.volume_history[-1][0]:
+            self.volume_history.append((timestamp, array('d', self.volume)))
+        self.thin_history(timestamp)
+        self.rows = rows
+        self.updated = timestamp
+
+    def thin_history(self, now):
+        kept = deque()
+        for entry in self.volume_history:
+            if entry[0] < now - VOLUME_HISTORY:
+                continue
+            if kept and entry is not self.volume_history[-1] and entry[0] - kept[-1][0] < history_spacing(now - entry[0]):
+                continue
+            kept.append(entry)
+        self.volume_history = kept
+
+    def entry(self, column, value):
+        return self.ids[column], self.symbols[column], self.names[column], self.price[column], value
+
+    def gainers(self, window, count=10):
+        change = self.change[window]
+        columns = heapq.nlargest(count, (c for c in range(len(change)) if not math.isnan(change[c])), key=change.__getitem__)
+        return [self.entry(column, change[column]) for column in columns]
+
+    def losers(self, window, count=10):
+        change = self.change[window]
+        columns = heapq.nsmallest(count, (c for c in range(len(change)) if not math.isnan(change[c])), key=change.__getitem__)
+        return [self.entry(column, change[column]) for column in columns]
+
+    def baseline(self, window):
+        # (timestamp, volumes) of the newest snapshot at least a window old, None until there is one
+        if self.updated is None:
+            return None
+        cutoff = self.updated - WINDOWS[window]
+        baseline = None
+        for entry in self.volume_history:
+            if entry[0] > cutoff:
+                break
+            baseline = entry
+        return baseline
+
+    def volume_spikes(self, window, count=10):
+        # 24h volume now against the same coin's 24h volume one window ago
+        baseline = self.baseline(window)
+        if baseline is None:
+            return []
+        baseline = baseline[1]
+        ratios = {}
+        for column in range(len(baseline)):
+            before = baseline[column]
+            now = self.volume[column]
+            if before > 0 and not math.isnan(now):
+                ratios[column] = now / before
+        columns = heapq.nlargest(count, ratios, key=ratios.__getitem__)
+        return [self.entry(column, ratios[column]) for column in columns]
@@ -0,0 +1,192 @@
+import functools
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+
+SUB_BUCKETS = 16  # per power of two, so a recorded value is known to within about 3%
+ERROR_HISTORY = 100
+QUANTILES = (0.5, 0.9, 0.99)
+
+# timings and counters cost one flag check while this is off; errors are rare and always kept
+enabled = False
+counters = {}
+histograms = {}
+errors = deque(maxlen=ERROR_HISTORY)  # (time, source, message)
+lock = threading.Lock()
+
+
+class Histogram:
+    # HdrHistogram-style log-linear buckets of microseconds: constant memory and relative
+    # precision however many samples, and percentiles without keeping the samples
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, micros):
+        mantissa, exponent = math.frexp(max(micros, 1.0))
+        index = exponent * SUB_BUCKETS + int((mantissa - 0.5) * 2 * SUB_BUCKETS)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += micros
+        self.max = max(self.max, micros)
+
+    def percentile(self, percent):
+        # the upper edge of the bucket holding that rank, never past the largest value seen
+        if not self.count:
+            return None
+        rank = max(math.ceil(self.count * percent / 100), 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                exponent, sub = divmod(index, SUB_BUCKETS)
+                return min(math.ldexp(0.5 + (sub + 1) / (2 * SUB_BUCKETS), exponent), self.max)
+        return self.max
+
+    def summary(self):
+        # milliseconds
+        return {'count': self.count, 'mean_ms': self.total / self.count / 1000 if self.count else None,
+                'p50_ms': ms(self.percentile(50)), 'p90_ms': ms(self.percentile(90)),
+                'p99_ms': ms(self.percentile(99)), 'max_ms': self.max / 1000}
+
+
+def ms(micros):
+    return micros / 1000 if micros is not None else None
+
+
+def enable(on=True):
+    global enabled
+    enabled = on
+
+
+def reset():
+    with lock:
+        counters.clear()
+        histograms.clear()
+        errors.clear()
+
+
+def count(name, amount=1):
+    if enabled:
+        with lock:
+            counters[name] = counters.get(name, 0) + amount
+
+
+def start():
+    # pair with finish(); None while off, so the timed code pays for nothing else
+    return time.perf_counter() if enabled else None
+
+
+def finish(name, started):
+    if started is not None:
+        observe(name, time.perf_counter() - started)
+
+
+def observe(name, seconds):
+    with lock:
+        histogram = histograms.get(name)
+        if histogram is None:
+            histogram = histograms[name] = Histogram()
+        histogram.record(seconds * 1e6)
+
+
+def timed(name):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def error(source, message):
+    with lock:
+        errors.append((time.time(), source, str(message)))
+        counters[f"errors.{source}"] = counters.get(f"errors.{source}", 0) + 1
+
+
+def snapshot():
+    with lock:
+        return {
+            'enabled': enabled,
+            'counters': dict(sorted(counters.items())),
+            'timings': {name: histogram.summary() for name, histogram in sorted(histograms.items())},
+            'errors': [{'time': timestamp, 'source': source, 'message': message}
+                       for timestamp, source, message in errors],
+        }
+
+
+def to_json():
+    return json.dumps(snapshot(), indent=2)
+
+
+def dump(path):
+    temp_path = path + '.tmp'
+    try:
+        with open(temp_path, 'w') as f:
+            f.write(to_json() + '\n')
+        os.replace(temp_path, path)
+    except OSError as e:
+        print(f"Could not write metrics to {path}: {e}")
+
+
+def metric_name(name):
+    return 'coinwatcher_' + ''.join(c if c.isalnum() else '_' for c in name)
+
+
+def to_prometheus():
+    # counters as *_total, timings as summaries in seconds
+    lines = []
+    with lock:
+        for name, value in sorted(counters.items()):
+            metric = metric_name(name) + '_total'
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        for name, histogram in sorted(histograms.items()):
+            metric = metric_name(name) + '_seconds'
+            lines.append(f"# TYPE {metric} summary")
+            for quantile in QUANTILES:
+                lines.append(f'{metric}{{quantile="{quantile}"}} {histogram.percentile(quantile * 100) / 1e6:.9f}')
+            lines += [f"{metric}_sum {histogram.total / 1e6:.9f}", f"{metric}_count {histogram.count}"]
+    return '\n'.join(lines) + '\n'
+
+
+def serve(port, host='127.0.0.1'):
+    # GET /metrics for Prometheus, /metrics.json for everything else, off the GUI thread;
+    # http.server is only imported here, it costs tens of ms at startup
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                content, content_type = to_prometheus(), 'text/plain; version=0.0.4'
+            elif self.path == '/metrics.json':
+                content, content_type = to_json(), 'application/json'
+            else:
+                self.send_error(404)
+                return
+            content = content.encode()
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Metrics at http://{host}:{server.server_address[1]}/metrics", flush=True)
+    return server
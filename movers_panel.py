@@ -0,0 +1,67 @@
+import time
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QListWidget, QComboBox, QPushButton
+from markets import WINDOWS
+from currency import format_age
+
+TOP_COUNT = 10
+
+
+class MoversPanel(QWidget):
+    # only ever draws what MarketMovers already holds; refreshing is the owner's business
+    def __init__(self, movers, format_money, parent=None):
+        super().__init__(parent)
+        self.movers = movers
+        self.format_money = format_money
+        self.setWindowTitle("CoinWatcher Top Movers")
+
+        layout = QVBoxLayout()
+        header = QHBoxLayout()
+        header.addWidget(QLabel("Window:"))
+        self.window_box = QComboBox()
+        self.window_box.addItems(list(WINDOWS))
+        self.window_box.setCurrentText('24h')
+        self.window_box.currentTextChanged.connect(self.refresh)
+        header.addWidget(self.window_box)
+        header.addStretch()
+        self.updated_label = QLabel()
+        header.addWidget(self.updated_label)
+        layout.addLayout(header)
+
+        lists = QHBoxLayout()
+        self.lists = {}
+        self.titles = {}
+        for title in ("Gainers", "Losers", "Volume Spikes"):
+            column = QVBoxLayout()
+            self.titles[title] = QLabel(title)
+            column.addWidget(self.titles[title])
+            self.lists[title] = QListWidget()
+            self.lists[title].setMinimumWidth(260)
+            column.addWidget(self.lists[title])
+            lists.addLayout(column)
+        layout.addLayout(lists)
+
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.hide)
+        layout.addWidget(close_button)
+        self.setLayout(layout)
+
+    def refresh(self):
+        window = self.window_box.currentText()
+        if self.movers.updated is None:
+            self.updated_label.setText("Waiting for the first market snapshot...")
+        else:
+            self.updated_label.setText(f"Updated {(time.time() - self.movers.updated) / 60:.0f} min ago")
+        baseline = self.movers.baseline(window)
+        if baseline is None:
+            self.titles["Volume Spikes"].setText(f"Volume Spikes (needs a snapshot {window} old)")
+        else:
+            self.titles["Volume Spikes"].setText(f"Volume Spikes (vs {format_age(self.movers.updated - baseline[0])} ago)")
+        for title, entries, suffix in (("Gainers", self.movers.gainers(window, TOP_COUNT), "%"),
+                                       ("Losers", self.movers.losers(window, TOP_COUNT), "%"),
+                                       ("Volume Spikes", self.movers.volume_spikes(window, TOP_COUNT), "x")):
+            widget = self.lists[title]
+            widget.clear()
+            for coin_id, symbol, name, price, value in entries:
+                value_text = f"{value:+.2f}%" if suffix == "%" else f"{value:.2f}x"
+                price_text = self.format_money(price, coin_id) if price == price else "?"
+                widget.addItem(f"{symbol.upper():<6} {value_text:>9}  {price_text}  {name}")
@@ -0,0 +1,18 @@
+import os
+
+
+def xdg_dir(variable, fallback):
+    base = os.environ.get(variable) or os.path.join(os.path.expanduser('~'), *fallback)
+    return os.path.join(base, 'coinwatcher')
+
+
+def data_dir():
+    return xdg_dir('XDG_DATA_HOME', ('.local', 'share'))
+
+
+def cache_dir():
+    return xdg_dir('XDG_CACHE_HOME', ('.cache',))
+
+
+def config_dir():
+    return xdg_dir('XDG_CONFIG_HOME', ('.config',))
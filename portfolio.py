@@ -0,0 +1,94 @@
+import math
+from currency import format_price
+
+RESYNC_EVERY = 10000  # price updates between exact re-summations of the running totals
+
+
+def parse_lots(text):
+    # "0.5@30000, 0.25@42000" -> [[0.5, 30000.0], [0.25, 42000.0]], quantity @ price paid per coin
+    lots = []
+    for part in text.replace(';', ',').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        quantity, _, price = part.partition('@')
+        if not price:
+            raise ValueError(f"'{part}' needs a purchase price, e.g. {part}@30000")
+        lots.append([float(quantity), float(price.replace('$', ''))])
+    return lots
+
+
+def format_lots(lots):
+    return ", ".join(f"{quantity:g}@{price:g}" for quantity, price in lots)
+
+
+def pnl_text(value, cost, money=format_price):
+    pnl = value - cost
+    text = f"{money(value)} ({'+' if pnl >= 0 else '-'}{money(abs(pnl))}"
+    if cost:
+        text += f", {pnl / cost * 100:+.2f}%"
+    return text + ")"
+
+
+class Portfolio:
+    # lots are only summed when holdings change; a price tick replaces that coin's value
+    # and moves the totals by the difference, however many lots or coins there are
+    def __init__(self):
+        self.quantity = {}  # ticker -> total quantity over all lots
+        self.cost = {}  # ticker -> total cost basis
+        self.value = {}  # ticker -> quantity at the last price, only for priced tickers
+        self.total_value = 0.0
+        self.total_cost = 0.0  # cost of the priced holdings, so P&L never mixes in unpriced coins
+        self.updates = 0
+
+    def __bool__(self):
+        return bool(self.quantity)
+
+    def __contains__(self, ticker):
+        return ticker in self.quantity
+
+    def set_holdings(self, favorites, prices):
+        self.quantity = {}
+        self.cost = {}
+        for ticker, data in favorites.items():
+            lots = data.get('lots')
+            if lots:
+                self.quantity[ticker] = math.fsum(quantity for quantity, price in lots)
+                self.cost[ticker] = math.fsum(quantity * price for quantity, price in lots)
+        self.value = {}
+        self.update({ticker: prices[ticker] for ticker in self.quantity if ticker in prices})
+        self.resync()
+
+    def update(self, prices):
+        changed = False
+        for ticker, price in prices.items():
+            quantity = self.quantity.get(ticker)
+            if quantity is None:
+                continue
+            value = quantity * price
+            previous = self.value.get(ticker)
+            if previous is None:
+                self.total_cost += self.cost[ticker]
+                previous = 0.0
+            self.value[ticker] = value
+            self.total_value += value - previous
+            changed = True
+        if changed:
+            self.updates += 1
+            if self.updates % RESYNC_EVERY == 0:
+                self.resync()
+        return changed
+
+    def resync(self):
+        # running sums drift after enough float additions, start them over now and then
+        self.total_value = math.fsum(self.value.values())
+        self.total_cost = math.fsum(self.cost[ticker] for ticker in self.value)
+
+    def holding(self, ticker):
+        # (quantity, value, cost) or None when the ticker isn't held or not priced yet
+        if ticker not in self.value:
+            return None
+        return self.quantity[ticker], self.value[ticker], self.cost[ticker]
+
+    def totals(self):
+        return self.total_value, self.total_cost
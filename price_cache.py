@@ -0,0 +1,72 @@
+import os
+import sqlite3
+from paths import data_dir
+
+
+class LastPriceCache:
+    # the last good price of every ticker, so a fresh start or an outage still has something to show
+    def __init__(self, path=None):
+        self.path = path or os.path.join(data_dir(), 'last_prices.sqlite')
+        self.connection = None
+        self.dirty = {}
+        self.dirty_rates = {}
+
+    def connect(self):
+        if self.connection is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.connection = sqlite3.connect(self.path)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS last_prices ("
+                                    "ticker TEXT PRIMARY KEY, price REAL NOT NULL, previous REAL, updated REAL NOT NULL)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS cross_rates ("
+                                    "currency TEXT PRIMARY KEY, rate REAL NOT NULL, updated REAL NOT NULL)")
+        return self.connection
+
+    def load(self):
+        # {ticker: (price, previous, updated)}
+        try:
+            rows = self.connect().execute("SELECT ticker, price, previous, updated FROM last_prices").fetchall()
+        except sqlite3.Error as e:
+            print(f"Could not read the price cache: {e}")
+            return {}
+        return {ticker: (price, previous, updated) for ticker, price, previous, updated in rows}
+
+    def load_rates(self):
+        # {currency: (units per USD, updated)}
+        try:
+            rows = self.connect().execute("SELECT currency, rate, updated FROM cross_rates").fetchall()
+        except sqlite3.Error as e:
+            print(f"Could not read the price cache: {e}")
+            return {}
+        return {currency: (rate, updated) for currency, rate, updated in rows}
+
+    def record_rates(self, matrix, currencies):
+        for currency in currencies:
+            self.dirty_rates[currency] = (matrix.rates[currency], matrix.rates_updated[currency])
+
+    def record(self, table, tickers):
+        # only remembered here; flush() writes them out in one transaction
+        for ticker in tickers:
+            if ticker in table:
+                self.dirty[ticker] = (table.get(ticker), table.get_previous(ticker), table.updated[ticker])
+
+    def flush(self):
+        if not self.dirty and not self.dirty_rates:
+            return
+        rows = [(ticker, price, previous, updated) for ticker, (price, previous, updated) in self.dirty.items()]
+        rates = [(currency, rate, updated) for currency, (rate, updated) in self.dirty_rates.items()]
+        self.dirty = {}
+        self.dirty_rates = {}
+        try:
+            with self.connect():
+                self.connection.executemany("INSERT OR REPLACE INTO last_prices VALUES (?, ?, ?, ?)", rows)
+                self.connection.executemany("INSERT OR REPLACE INTO cross_rates VALUES (?, ?, ?)", rates)
+        except sqlite3.Error as e:
+            print(f"Could not write the price cache: {e}")
+
+    def close(self):
+        self.flush()
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
@@ -0,0 +1,136 @@
+from collections import deque
+from PyQt6.QtWidgets import QWidget
+from PyQt6.QtGui import QPainter, QPixmap, QColor
+from PyQt6.QtCore import Qt, QRect
+
+SPARKLINE = 'sparkline'
+CANDLES = 'candles'
+CHART_SPAN = 60 * 60  # seconds shown across the chart
+CHART_WIDTH = 160
+CHART_HEIGHT = 40
+CANDLE_WIDTH = 4  # px per candle, gap included
+
+
+class PriceChart(QWidget):
+    # samples are folded into one [index, open, high, low, close] bucket per column, so the
+    # cost of drawing depends on the chart width and never on how many samples it has seen
+    def __init__(self, mode=SPARKLINE, span=CHART_SPAN, parent=None):
+        super().__init__(parent)
+        self.setFixedSize(CHART_WIDTH, CHART_HEIGHT)
+        self.mode = mode
+        self.span = span
+        self.line_color = QColor(255, 255, 255)
+        self.up_color = QColor(80, 220, 120)
+        self.down_color = QColor(240, 90, 90)
+        self.buckets = deque()
+        self.low = None
+        self.high = None
+        self.pixmap = QPixmap(self.size())
+        self.pixmap.fill(Qt.GlobalColor.transparent)
+
+    def slot_width(self):
+        return CANDLE_WIDTH if self.mode == CANDLES else 1
+
+    def columns(self):
+        return max(self.width() // self.slot_width(), 1)
+
+    def bucket_seconds(self):
+        return self.span / self.columns()
+
+    def set_mode(self, mode, samples=()):
+        self.mode = mode
+        self.set_samples(samples)
+
+    def set_line_color(self, color):
+        self.line_color = QColor(color)
+        self.redraw()
+
+    def set_samples(self, samples):
+        self.buckets.clear()
+        for timestamp, price in samples:
+            self.add_to_buckets(timestamp, price)
+        self.redraw()
+
+    def add_to_buckets(self, timestamp, price):
+        index = int(timestamp // self.bucket_seconds())
+        if self.buckets:
+            bucket = self.buckets[-1]
+            if index < bucket[0]:
+                return False
+            if index == bucket[0]:
+                bucket[2] = max(bucket[2], price)
+                bucket[3] = min(bucket[3], price)
+                bucket[4] = price
+                return True
+        self.buckets.append([index, price, price, price, price])
+        while self.buckets[0][0] <= index - self.columns():
+            self.buckets.popleft()
+        return True
+
+    def add_sample(self, timestamp, price):
+        newest = self.buckets[-1][0] if self.buckets else None
+        if not self.add_to_buckets(timestamp, price):
+            return
+        if self.low is None or not self.low <= price <= self.high:
+            self.redraw()  # out of scale, the only case that needs a full redraw
+            return
+        shift = self.buckets[-1][0] - newest
+        if shift:
+            self.pixmap.scroll(-shift * self.slot_width(), 0, self.pixmap.rect())
+        painter = QPainter(self.pixmap)
+        start = self.column_x(self.buckets[-2]) + self.slot_width() if len(self.buckets) > 1 else 0
+        self.clear(painter, start)
+        self.draw_bucket(painter, len(self.buckets) - 1)
+        painter.end()
+        self.update()
+
+    def update_range(self):
+        if not self.buckets:
+            self.low = self.high = None
+            return
+        low = min(bucket[3] for bucket in self.buckets)
+        high = max(bucket[2] for bucket in self.buckets)
+        padding = (high - low) * 0.1 or abs(high) * 0.001 or 1
+        self.low = low - padding
+        self.high = high + padding
+
+    def column_x(self, bucket):
+        return (self.columns() - 1 - (self.buckets[-1][0] - bucket[0])) * self.slot_width()
+
+    def price_y(self, price):
+        return round((self.height() - 1) * (self.high - price) / (self.high - self.low))
+
+    def clear(self, painter, start):
+        painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Source)
+        painter.fillRect(QRect(start, 0, self.width() - start, self.height()), Qt.GlobalColor.transparent)
+        painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_SourceOver)
+
+    def redraw(self):
+        self.update_range()
+        painter = QPainter(self.pixmap)
+        self.clear(painter, 0)
+        for i in range(len(self.buckets)):
+            self.draw_bucket(painter, i)
+        painter.end()
+        self.update()
+
+    def draw_bucket(self, painter, i):
+        index, open_, high, low, close = self.buckets[i]
+        x = self.column_x(self.buckets[i])
+        if self.mode == CANDLES:
+            color = self.up_color if close >= open_ else self.down_color
+            painter.setPen(color)
+            middle = x + self.slot_width() // 2
+            painter.drawLine(middle, self.price_y(high), middle, self.price_y(low))
+            top = self.price_y(max(open_, close))
+            painter.fillRect(QRect(x, top, self.slot_width() - 1, max(self.price_y(min(open_, close)) - top, 1)), color)
+        else:
+            painter.setPen(self.line_color)
+            if i > 0:
+                previous = self.buckets[i - 1]
+                painter.drawLine(self.column_x(previous), self.price_y(previous[4]), x, self.price_y(open_))
+            painter.drawLine(x, self.price_y(high), x, self.price_y(low))
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self.pixmap)
@@ -0,0 +1,245 @@
+import re
+import threading
+import time
+import metrics
+
+COINGECKO_API = "https://api.coingecko.com/api/v3"
+MAX_URL_LENGTH = 2000  # stay well below what proxies and the API will accept
+REQUEST_TIMEOUT = (3.05, 10)  # (connect, read) seconds
+POOL_SIZE = 4
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after=None):
+        message = "rate limited by the API"
+        if retry_after:
+            message += f", retry after {retry_after:.0f}s"
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class PriceTable:
+    def __init__(self):
+        self.prices = {}
+        self.previous = {}
+        self.updated = {}
+        self.cached = set()  # seeded from a previous run and not refreshed since
+
+    def __contains__(self, ticker):
+        return ticker in self.prices
+
+    def update(self, prices, timestamp=None):
+        timestamp = timestamp or time.time()
+        for ticker, price in prices.items():
+            if ticker in self.prices:
+                self.previous[ticker] = self.prices[ticker]
+            self.prices[ticker] = price
+            self.updated[ticker] = timestamp
+            self.cached.discard(ticker)
+
+    def seed(self, entries):
+        # last known prices from a previous run; live updates simply overwrite them
+        for ticker, (price, previous, updated) in entries.items():
+            if ticker not in self.prices:
+                self.prices[ticker] = price
+                if previous is not None:
+                    self.previous[ticker] = previous
+                self.updated[ticker] = updated
+                self.cached.add(ticker)
+
+    def get(self, ticker):
+        return self.prices.get(ticker)
+
+    def get_previous(self, ticker):
+        return self.previous.get(ticker)
+
+    def is_cached(self, ticker):
+        return ticker in self.cached
+
+    def age(self, ticker):
+        if ticker not in self.updated:
+            return None
+        return time.time() - self.updated[ticker]
+
+
+class PriceFetcher:
+    def __init__(self, base_url=COINGECKO_API, vs_currency="usd", max_url_length=MAX_URL_LENGTH,
+                 timeout=REQUEST_TIMEOUT):
+        self.base_url = base_url
+        self.vs_currency = vs_currency
+        self.quote_currencies = [vs_currency]  # asked for in the same request
+        self.quotes = {}  # ticker -> {currency: price}, for quotes beyond vs_currency
+        self.max_url_length = max_url_length
+        self.timeout = timeout
+        self.session = None  # requests is slow to import, so the session waits for the first request
+        self.cache = {}  # url -> {'etag', 'expires', 'data'}
+        self.counters = {'requests': 0, 'bytes_received': 0, 'not_modified': 0, 'cache_hits': 0}
+        self.lock = threading.Lock()
+
+    def create_session(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util import make_headers
+        # one long-lived session so keep-alive connections to the API get reused between ticks
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        # make_headers advertises br (and zstd) only when urllib3 can actually decode them
+        session.headers.update({
+            'Accept': 'application/json',
+            'Accept-Encoding': make_headers(accept_encoding=True)['accept-encoding'],
+            'Connection': 'keep-alive',
+        })
+        return session
+
+    def get_session(self):
+        with self.lock:
+            if self.session is None:
+                self.session = self.create_session()
+            return self.session
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+        connections = 0
+        pooled_requests = 0
+        adapters = self.session.adapters.values() if self.session is not None else ()
+        # the same adapter is mounted for http and https, count it once
+        for adapter in {id(a): a for a in adapters}.values():
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    connections += pool.num_connections
+                    pooled_requests += pool.num_requests
+        stats['connections_opened'] = connections
+        stats['connections_reused'] = max(pooled_requests - connections, 0)
+        return stats
+
+    def get_json(self, url):
+        now = time.time()
+        with self.lock:
+            cached = self.cache.get(url)
+        if cached and cached['expires'] > now:
+            self.count('cache_hits')
+            return cached['data']
+
+        headers = {}
+        if cached and cached['etag']:
+            headers['If-None-Match'] = cached['etag']
+        started = metrics.start()
+        response = self.get_session().get(url, headers=headers, timeout=self.timeout)
+        metrics.finish('http.request', started)
+        metrics.count(f"http.status.{response.status_code}")
+        self.count('requests')
+        if response.status_code == 304 and cached:
+            response.close()
+            self.count('not_modified')
+            cached['expires'] = now + max_age(response.headers)
+            return cached['data']
+
+        if response.status_code == 429:
+            response.close()
+            raise RateLimited(retry_after(response.headers))
+        response.raise_for_status()
+        started = metrics.start()
+        data = response.json()
+        metrics.finish('json.parse', started)
+        self.count('bytes_received', response.raw.tell() or len(response.content))
+        etag = response.headers.get('ETag')
+        expires = now + max_age(response.headers)
+        with self.lock:
+            if etag or expires > now:
+                self.cache[url] = {'etag': etag, 'expires': expires, 'data': data}
+            else:
+                self.cache.pop(url, None)
+        return data
+
+    def set_quote_currencies(self, currencies):
+        self.quote_currencies = [self.vs_currency, *(c for c in currencies if c != self.vs_currency)]
+
+    def take_quotes(self):
+        with self.lock:
+            quotes, self.quotes = self.quotes, {}
+        return quotes
+
+    def price_url(self, ids):
+        return f"{self.base_url}/simple/price?ids={','.join(ids)}&vs_currencies={','.join(self.quote_currencies)}"
+
+    def chunk_ids(self, tickers):
+        # split the id list so that no single request URL grows past max_url_length
+        budget = self.max_url_length - len(self.price_url([]))
+        chunks = []
+        chunk = []
+        length = 0
+        for ticker in tickers:
+            extra = len(ticker) + (1 if chunk else 0)
+            if chunk and length + extra > budget:
+                chunks.append(chunk)
+                chunk = []
+                extra = len(ticker)
+                length = 0
+            chunk.append(ticker)
+            length += extra
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def fetch(self, tickers, cancelled=None):
+        # unique, order preserving; one request per chunk rather than per ticker
+        tickers = list(dict.fromkeys(t for t in tickers if t))
+        prices = {}
+        quotes = {}
+        urls = []
+        for chunk in self.chunk_ids(tickers):
+            if cancelled is not None and cancelled.is_set():
+                break
+            url = self.price_url(chunk)
+            urls.append(url)
+            data = self.get_json(url)
+            for ticker in chunk:
+                quote = data.get(ticker)
+                if quote and self.vs_currency in quote:
+                    prices[ticker] = quote[self.vs_currency]
+                    if len(quote) > 1:
+                        quotes[ticker] = quote
+        with self.lock:
+            # only the chunks of the current watch list are worth revalidating; other endpoints
+            # (markets, the coin list) keep their entries for the next conditional request
+            prefix = self.price_url([]).split('?')[0]
+            self.cache = {url: entry for url, entry in self.cache.items() if url in urls or not url.startswith(prefix)}
+            self.quotes.update(quotes)
+        return prices
+
+
+def max_age(headers):
+    cache_control = headers.get('Cache-Control', '')
+    if 'no-cache' in cache_control or 'no-store' in cache_control:
+        return 0
+    match = re.search(r'max-age=(\d+)', cache_control)
+    return int(match.group(1)) if match else 0
+
+
+def retry_after(headers):
+    # Retry-After is either a number of seconds or an HTTP date
+    value = headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
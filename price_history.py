@@ -0,0 +1,182 @@
+import bisect
+import mmap
+import os
+import re
+import struct
+import time
+from paths import data_dir
+
+HEADER = struct.Struct('<8sIII')  # magic, capacity, head, count
+RECORD = struct.Struct('<dd')  # timestamp, price
+MAGIC = b'CWHIST01'
+RETENTION = 24 * 60 * 60  # seconds of history kept per ticker
+RESOLUTION = 1.0  # samples closer together than this replace each other
+
+
+class TickerRing:
+    # fixed-size ring of (timestamp, price) records in a memory-mapped file
+    def __init__(self, path, capacity):
+        self.path = path
+        self.open(capacity)
+
+    def open(self, capacity):
+        if os.path.exists(self.path) and os.path.getsize(self.path) < HEADER.size:
+            os.remove(self.path)  # cut short by a crash; too small to map or to hold a header
+        new_file = not os.path.exists(self.path)
+        size = HEADER.size + capacity * RECORD.size
+        self.file = open(self.path, 'w+b' if new_file else 'r+b')
+        if new_file:
+            self.file.truncate(size)
+            self.file.write(HEADER.pack(MAGIC, capacity, 0, 0))
+            self.file.flush()
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        magic, self.capacity, self.head, self.count = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or len(self.map) != HEADER.size + self.capacity * RECORD.size:
+            self.close()
+            os.remove(self.path)
+            self.open(capacity)
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def write_header(self):
+        HEADER.pack_into(self.map, 0, MAGIC, self.capacity, self.head, self.count)
+
+    def record(self, index):
+        # index is logical: 0 is the oldest sample still in the ring
+        slot = (self.head - self.count + index) % self.capacity
+        return RECORD.unpack_from(self.map, HEADER.size + slot * RECORD.size)
+
+    def last(self):
+        return self.record(self.count - 1) if self.count else None
+
+    def append(self, timestamp, price, resolution=RESOLUTION):
+        last = self.last()
+        if last is not None and timestamp - last[0] < resolution:
+            slot = (self.head - 1) % self.capacity  # too close to the previous sample, replace it
+        else:
+            slot = self.head
+            self.head = (self.head + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+        RECORD.pack_into(self.map, HEADER.size + slot * RECORD.size, timestamp, price)
+        self.write_header()
+
+    def bisect_time(self, timestamp):
+        # timestamps are appended in order, so the ring can be searched like a sorted list
+        return bisect.bisect_left(range(self.count), timestamp, key=lambda i: self.record(i)[0])
+
+    def since(self, timestamp):
+        return [self.record(i) for i in range(self.bisect_time(timestamp), self.count)]
+
+    def tail(self, n):
+        return [self.record(i) for i in range(max(self.count - n, 0), self.count)]
+
+
+class PriceHistory:
+    def __init__(self, directory=None, retention=RETENTION, resolution=RESOLUTION):
+        self.directory = directory or os.path.join(data_dir(), 'history')
+        self.retention = retention
+        self.resolution = resolution
+        self.capacity = max(int(retention / resolution), 2)
+        self.rings = {}
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, ticker):
+        return os.path.join(self.directory, re.sub(r'[^a-z0-9._-]', '_', ticker.lower()) + '.ring')
+
+    def ring(self, ticker, create=True):
+        ring = self.rings.get(ticker)
+        if ring is None:
+            path = self.path(ticker)
+            if not create and not os.path.exists(path):
+                return None
+            ring = TickerRing(path, self.capacity)
+            self.rings[ticker] = ring
+            if ring.capacity != self.capacity:
+                self.compact(ticker)  # retention settings changed since the file was made
+                ring = self.rings[ticker]
+        return ring
+
+    def append(self, ticker, price, timestamp=None):
+        self.ring(ticker).append(timestamp or time.time(), price, self.resolution)
+
+    def append_many(self, prices, timestamp=None):
+        timestamp = timestamp or time.time()
+        for ticker, price in prices.items():
+            self.append(ticker, price, timestamp)
+
+    def samples(self, ticker, seconds):
+        ring = self.ring(ticker, create=False)
+        return ring.since(time.time() - seconds) if ring else []
+
+    def tail(self, ticker, n):
+        ring = self.ring(ticker, create=False)
+        return ring.tail(n) if ring else []
+
+    def latest(self, ticker):
+        ring = self.ring(ticker, create=False)
+        return ring.last() if ring else None
+
+    def previous(self, ticker):
+        samples = self.tail(ticker, 2)
+        return samples[0] if len(samples) == 2 else None
+
+    def price_at(self, ticker, timestamp):
+        # first sample at or after timestamp, i.e. the reference price for a window
+        ring = self.ring(ticker, create=False)
+        if not ring or not ring.count:
+            return None
+        index = ring.bisect_time(timestamp)
+        return ring.record(min(index, ring.count - 1))
+
+    def price_near(self, ticker, timestamp):
+        # the sample closest to timestamp, so polls a little early or late still count
+        ring = self.ring(ticker, create=False)
+        if not ring or not ring.count:
+            return None
+        index = ring.bisect_time(timestamp)
+        nearby = [ring.record(i) for i in (index - 1, index) if 0 <= i < ring.count]
+        return min(nearby, key=lambda sample: abs(sample[0] - timestamp))
+
+    def percent_change(self, ticker, window=None):
+        # change against the previous sample, or against the start of a time window
+        latest = self.latest(ticker)
+        if latest is None:
+            return None
+        reference = self.previous(ticker) if window is None else self.price_at(ticker, latest[0] - window)
+        if reference is None or reference[0] >= latest[0] or not reference[1]:
+            return None
+        return (latest[1] - reference[1]) / reference[1] * 100
+
+    def compact(self, ticker):
+        # rewrite the ring in order, dropping samples past retention and applying the current capacity
+        ring = self.ring(ticker, create=False)
+        if ring is None:
+            return
+        keep = ring.since(time.time() - self.retention)[-self.capacity:]
+        ring.close()
+        temp_path = ring.path + '.tmp'
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        compacted = TickerRing(temp_path, self.capacity)
+        for timestamp, price in keep:
+            compacted.append(timestamp, price, resolution=0)
+        compacted.map.flush()
+        compacted.close()
+        os.replace(temp_path, ring.path)
+        self.rings[ticker] = TickerRing(ring.path, self.capacity)
+
+    def compact_all(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.ring'):
+                self.compact(name[:-len('.ring')])
+
+    def flush(self):
+        for ring in self.rings.values():
+            ring.map.flush()
+
+    def close(self):
+        for ring in self.rings.values():
+            ring.close()
+        self.rings = {}
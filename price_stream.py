@@ -0,0 +1,135 @@
+import json
+from PyQt6.QtCore import QObject, QTimer, QUrl, pyqtSignal
+from PyQt6.QtNetwork import QAbstractSocket
+from PyQt6.QtWebSockets import QWebSocket
+from providers import exchange_symbol
+from rate_limit import Backoff
+
+STREAM_URL = "wss://stream.binance.com:9443/stream"
+MAX_REFRESH_HZ = 4  # the UI never repaints faster than this, however busy the feed is
+RECONNECT_BASE = 1
+RECONNECT_CAP = 60
+
+
+class PriceStream(QObject):
+    # live trades from an exchange WebSocket feed (Binance aggTrade streams by default);
+    # messages only overwrite a pending price table, which is flushed at most MAX_REFRESH_HZ
+    prices_ready = pyqtSignal(dict)
+    state_changed = pyqtSignal(str)
+
+    def __init__(self, url=STREAM_URL, symbol_lookup=None, max_rate=MAX_REFRESH_HZ, parent=None):
+        super().__init__(parent)
+        self.url = url
+        self.symbol_lookup = symbol_lookup
+        self.streams = {}  # stream name -> ticker
+        self.symbols = {}  # exchange symbol -> ticker
+        self.pending = {}
+        self.running = False
+        self.message_id = 0
+        self.messages = 0
+        self.backoff = Backoff(RECONNECT_BASE, RECONNECT_CAP)
+
+        self.socket = None  # creating a QWebSocket initializes the network stack, so wait until needed
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(int(1000 / max_rate))
+        self.flush_timer.timeout.connect(self.flush)
+        self.reconnect_timer = QTimer(self)
+        self.reconnect_timer.setSingleShot(True)
+        self.reconnect_timer.timeout.connect(self.connect_socket)
+
+    def symbol(self, ticker):
+        symbol = exchange_symbol(ticker, self.symbol_lookup)
+        return f"{symbol}USDT" if symbol else None
+
+    def create_socket(self):
+        self.socket = QWebSocket()
+        self.socket.setParent(self)
+        self.socket.connected.connect(self.on_connected)
+        self.socket.disconnected.connect(self.on_disconnected)
+        self.socket.textMessageReceived.connect(self.on_message)
+        self.socket.errorOccurred.connect(self.on_error)
+
+    def is_connected(self):
+        return self.socket is not None and self.socket.state() == QAbstractSocket.SocketState.ConnectedState
+
+    def set_tickers(self, tickers):
+        streams = {}
+        for ticker in tickers:
+            symbol = self.symbol(ticker)
+            if symbol:
+                streams[f"{symbol.lower()}@aggTrade"] = ticker
+        added = [stream for stream in streams if stream not in self.streams]
+        removed = [stream for stream in self.streams if stream not in streams]
+        self.streams = streams
+        self.symbols = {stream.split('@')[0].upper(): ticker for stream, ticker in streams.items()}
+        if not streams:
+            self.stop()
+        elif not self.running:
+            self.start()
+        elif self.is_connected():
+            self.send('UNSUBSCRIBE', removed)
+            self.send('SUBSCRIBE', added)
+
+    def start(self):
+        self.running = True
+        self.connect_socket()
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        self.reconnect_timer.stop()
+        self.flush_timer.stop()
+        self.pending = {}
+        if self.socket is not None:
+            self.socket.close()
+        self.state_changed.emit("stopped")
+
+    def connect_socket(self):
+        if self.running and not self.is_connected():
+            if self.socket is None:
+                self.create_socket()
+            self.state_changed.emit("connecting")
+            self.socket.open(QUrl(self.url))
+
+    def send(self, method, streams):
+        if streams:
+            self.message_id += 1
+            self.socket.sendTextMessage(json.dumps({'method': method, 'params': streams, 'id': self.message_id}))
+
+    def on_connected(self):
+        self.backoff.reset()
+        self.send('SUBSCRIBE', list(self.streams))  # a fresh connection has no subscriptions yet
+        self.state_changed.emit("live")
+
+    def on_disconnected(self):
+        if self.running and not self.reconnect_timer.isActive():
+            delay = self.backoff.next_delay()
+            self.state_changed.emit(f"reconnecting in {delay:.0f}s")
+            self.reconnect_timer.start(int(delay * 1000))
+
+    def on_error(self, error):
+        self.state_changed.emit(f"error: {self.socket.errorString()}")
+        if self.socket.state() == QAbstractSocket.SocketState.UnconnectedState:
+            self.on_disconnected()
+
+    def on_message(self, message):
+        self.messages += 1
+        try:
+            data = json.loads(message)
+            data = data.get('data', data)  # combined streams wrap each event
+            ticker = self.symbols.get(data.get('s'))
+            if ticker is None or 'p' not in data:
+                return
+            self.pending[ticker] = float(data['p'])
+        except (ValueError, AttributeError, TypeError):
+            return
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def flush(self):
+        if self.pending:
+            prices, self.pending = self.pending, {}
+            self.prices_ready.emit(prices)
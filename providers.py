@@ -0,0 +1,331 @@
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import quote
+from price_fetcher import PriceFetcher, RateLimited
+
+FASTEST = 'fastest'
+MEDIAN = 'median'
+FANOUT = 2  # providers raced per request in fastest mode
+EWMA_WEIGHT = 0.2
+THROTTLE_COOLDOWN = 60  # seconds a provider rests after a 429 without Retry-After
+
+# CoinGecko ids of common coins and their exchange symbols; the coin catalog fills in the rest
+SYMBOLS = {
+    'bitcoin': 'BTC', 'ethereum': 'ETH', 'tether': 'USDT', 'binancecoin': 'BNB', 'solana': 'SOL',
+    'ripple': 'XRP', 'usd-coin': 'USDC', 'cardano': 'ADA', 'dogecoin': 'DOGE', 'tron': 'TRX',
+    'avalanche-2': 'AVAX', 'shiba-inu': 'SHIB', 'polkadot': 'DOT', 'chainlink': 'LINK',
+    'litecoin': 'LTC', 'bitcoin-cash': 'BCH', 'uniswap': 'UNI', 'stellar': 'XLM', 'monero': 'XMR',
+    'cosmos': 'ATOM', 'ethereum-classic': 'ETC', 'near': 'NEAR', 'aptos': 'APT', 'arbitrum': 'ARB',
+    'optimism': 'OP', 'pepe': 'PEPE', 'sui': 'SUI', 'filecoin': 'FIL', 'algorand': 'ALGO', 'tezos': 'XTZ',
+}
+LISTED_SYMBOLS = set(SYMBOLS.values())
+
+
+class UnknownSymbol(Exception):
+    pass
+
+
+def exchange_symbol(ticker, symbol_lookup=None):
+    # SYMBOLS first; a catalog symbol is only used if it belongs to that one coin and none of
+    # the listed coins trade under it, so a lookalike token never gets the real coin's price
+    symbol = SYMBOLS.get(ticker)
+    if symbol is None and symbol_lookup is not None:
+        symbol = symbol_lookup(ticker)
+        if symbol and symbol.upper() in LISTED_SYMBOLS:
+            symbol = None
+    return symbol.upper() if symbol else None
+
+
+class CoinGeckoProvider(PriceFetcher):
+    name = 'coingecko'
+
+
+class CoinCapProvider(PriceFetcher):
+    # the keyless v2 API is gone and v3 wants a key, so CoinCap is only used when asked for
+    name = 'coincap'
+
+    def __init__(self, base_url="https://rest.coincap.io/v3", api_key=None, **kwargs):
+        super().__init__(base_url, **kwargs)
+        self.api_key = api_key or os.environ.get('COINCAP_API_KEY')
+        if not self.api_key:
+            raise ValueError("the coincap provider needs an API key in COINCAP_API_KEY")
+
+    def create_session(self):
+        session = super().create_session()
+        session.headers['Authorization'] = f"Bearer {self.api_key}"
+        return session
+
+    def price_url(self, ids):
+        return f"{self.base_url}/assets?ids={','.join(ids)}"
+
+    def fetch(self, tickers, cancelled=None):
+        prices = {}
+        for chunk in self.chunk_ids(list(dict.fromkeys(tickers))):
+            if cancelled is not None and cancelled.is_set():
+                break
+            for asset in self.get_json(self.price_url(chunk)).get('data', []):
+                if asset.get('priceUsd') is not None:
+                    prices[asset['id']] = float(asset['priceUsd'])
+        return prices
+
+
+class ExchangeProvider(PriceFetcher, ABC):
+    # exchanges quote symbol pairs, so tickers are mapped through SYMBOLS (or the catalog);
+    # a batch rejected for one unknown pair is probed pair by pair once, and the bad ones skipped after
+    quote_currency = 'USD'
+
+    def __init__(self, base_url, symbol_lookup=None, **kwargs):
+        super().__init__(base_url, **kwargs)
+        self.symbol_lookup = symbol_lookup
+        self.unsupported = set()
+
+    def symbol(self, ticker):
+        return exchange_symbol(ticker, self.symbol_lookup)
+
+    def pair(self, symbol):
+        return f"{symbol}{self.quote_currency}"
+
+    @abstractmethod
+    def fetch_pairs(self, pairs):
+        # {pair: price} for the pairs the exchange quotes; raises UnknownSymbol if it rejects the batch
+        pass
+
+    def fetch(self, tickers, cancelled=None):
+        pairs = {}
+        for ticker in dict.fromkeys(tickers):
+            symbol = self.symbol(ticker)
+            if symbol and self.pair(symbol) not in self.unsupported:
+                pairs[self.pair(symbol)] = ticker
+        if not pairs:
+            return {}
+        try:
+            quoted = self.fetch_pairs(list(pairs))
+        except UnknownSymbol:
+            quoted = {}
+            for pair in pairs:
+                if cancelled is not None and cancelled.is_set():
+                    break
+                try:
+                    quoted.update(self.fetch_pairs([pair]))
+                except UnknownSymbol:
+                    self.unsupported.add(pair)
+        return {pairs[pair]: price for pair, price in quoted.items() if pair in pairs}
+
+
+class KrakenProvider(ExchangeProvider):
+    name = 'kraken'
+    aliases = {'BTC': 'XBT', 'DOGE': 'XDG'}
+
+    def __init__(self, base_url="https://api.kraken.com/0/public", **kwargs):
+        super().__init__(base_url, **kwargs)
+
+    def pair(self, symbol):
+        return f"{self.aliases.get(symbol, symbol)}USD"
+
+    def fetch_pairs(self, pairs):
+        data = self.get_json(f"{self.base_url}/Ticker?pair={','.join(pairs)}")
+        if data.get('error'):
+            if any('Unknown asset pair' in error for error in data['error']):
+                raise UnknownSymbol(data['error'])
+            raise ValueError(', '.join(data['error']))
+        # Kraken answers with its own pair names, e.g. XBTUSD comes back as XXBTZUSD
+        prices = {}
+        for pair in pairs:
+            base = pair[:-3]
+            for key in (pair, f"X{base}ZUSD"):
+                if key in data['result']:
+                    prices[pair] = float(data['result'][key]['c'][0])
+                    break
+        return prices
+
+
+class BinanceProvider(ExchangeProvider):
+    name = 'binance'
+    quote_currency = 'USDT'  # close enough to USD for an at-a-glance ticker
+
+    def __init__(self, base_url="https://api.binance.com/api/v3", **kwargs):
+        super().__init__(base_url, **kwargs)
+
+    def fetch_pairs(self, pairs):
+        import requests
+        symbols = quote(json.dumps(pairs, separators=(',', ':')))
+        try:
+            data = self.get_json(f"{self.base_url}/ticker/price?symbols={symbols}")
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 400:
+                raise UnknownSymbol(str(e))
+            raise
+        return {item['symbol']: float(item['price']) for item in data}
+
+
+class Scoreboard:
+    # moving averages of latency and error rate per provider; lower score is healthier
+    def __init__(self, names):
+        self.lock = threading.Lock()
+        self.entries = {name: {'latency': 1.0, 'error_rate': 0.0, 'requests': 0, 'errors': 0, 'resting_until': 0.0}
+                        for name in names}
+
+    def record(self, name, latency, ok):
+        with self.lock:
+            entry = self.entries[name]
+            entry['requests'] += 1
+            entry['errors'] += 0 if ok else 1
+            if ok:
+                entry['latency'] += EWMA_WEIGHT * (latency - entry['latency'])
+            entry['error_rate'] += EWMA_WEIGHT * ((0.0 if ok else 1.0) - entry['error_rate'])
+
+    def rest(self, name, seconds):
+        with self.lock:
+            self.entries[name]['resting_until'] = time.monotonic() + seconds
+
+    def score(self, name):
+        entry = self.entries[name]
+        return entry['latency'] * (1 + 4 * entry['error_rate'])
+
+    def ranked(self):
+        now = time.monotonic()
+        with self.lock:
+            available = [name for name, entry in self.entries.items() if entry['resting_until'] <= now]
+            return sorted(available, key=self.score)
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self.lock:
+            return {name: dict(entry, resting=max(entry['resting_until'] - now, 0.0))
+                    for name, entry in self.entries.items()}
+
+
+class MultiSourceFetcher:
+    # same interface as PriceFetcher; the first provider is the primary one (budget, coin catalog)
+    def __init__(self, providers, strategy=FASTEST, fanout=FANOUT):
+        self.providers = {provider.name: provider for provider in providers}
+        self.primary = providers[0]
+        self.strategy = strategy
+        self.fanout = fanout
+        self.scoreboard = Scoreboard(self.providers)
+        self.executor = ThreadPoolExecutor(max_workers=2 * len(providers), thread_name_prefix='provider')
+
+    @property
+    def base_url(self):
+        return self.primary.base_url
+
+    def get_json(self, url):
+        return self.primary.get_json(url)
+
+    def set_quote_currencies(self, currencies):
+        for provider in self.providers.values():
+            if isinstance(provider, PriceFetcher):
+                provider.set_quote_currencies(currencies)
+
+    def take_quotes(self):
+        # a provider that lost the race still leaves its quotes here for the next update
+        quotes = {}
+        for provider in self.providers.values():
+            if isinstance(provider, PriceFetcher):
+                quotes.update(provider.take_quotes())
+        return quotes
+
+    def chunk_ids(self, tickers):
+        return self.primary.chunk_ids(tickers)
+
+    def timed_fetch(self, name, tickers, cancelled):
+        start = time.monotonic()
+        try:
+            prices = self.providers[name].fetch(tickers, cancelled=cancelled)
+        except RateLimited as e:
+            self.scoreboard.record(name, time.monotonic() - start, False)
+            self.scoreboard.rest(name, e.retry_after or THROTTLE_COOLDOWN)
+            raise
+        except Exception:
+            self.scoreboard.record(name, time.monotonic() - start, False)
+            raise
+        self.scoreboard.record(name, time.monotonic() - start, bool(prices))
+        return prices
+
+    def fetch(self, tickers, cancelled=None):
+        tickers = list(dict.fromkeys(t for t in tickers if t))
+        ranked = self.scoreboard.ranked()
+        if not ranked:
+            raise RateLimited(min(entry['resting'] for entry in self.scoreboard.snapshot().values()))
+        chosen = ranked if self.strategy == MEDIAN else ranked[:self.fanout]
+        pending = {self.executor.submit(self.timed_fetch, name, tickers, cancelled): name for name in chosen}
+        backups = [] if self.strategy == MEDIAN else ranked[self.fanout:]
+        answers = {}
+        errors = []
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.pop(future)
+                try:
+                    answers[future] = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    if backups:
+                        # fail over to the next healthiest provider
+                        name = backups.pop(0)
+                        pending[self.executor.submit(self.timed_fetch, name, tickers, cancelled)] = name
+            if self.strategy == FASTEST:
+                covered = set().union(*answers.values()) if answers else set()
+                if covered.issuperset(tickers):
+                    break  # slower providers finish in the background and only update the scoreboard
+
+        if not any(answers.values()):
+            if errors and all(isinstance(e, RateLimited) for e in errors):
+                raise RateLimited(min((e.retry_after or THROTTLE_COOLDOWN) for e in errors))
+            if errors:
+                raise errors[0]
+            return {}
+        if self.strategy == MEDIAN:
+            import statistics
+            quotes = {}
+            for prices in answers.values():
+                for ticker, price in prices.items():
+                    quotes.setdefault(ticker, []).append(price)
+            return {ticker: statistics.median(values) for ticker, values in quotes.items()}
+        prices = {}
+        for prices_from_provider in answers.values():
+            for ticker, price in prices_from_provider.items():
+                prices.setdefault(ticker, price)  # answers are in arrival order, first one wins
+        return prices
+
+    def stats(self):
+        return {'providers': self.scoreboard.snapshot(),
+                **{f"{name}_http": provider.stats() for name, provider in self.providers.items()}}
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        for provider in self.providers.values():
+            provider.close()
+
+
+PROVIDERS = {
+    'coingecko': CoinGeckoProvider,
+    'coincap': CoinCapProvider,
+    'kraken': KrakenProvider,
+    'binance': BinanceProvider,
+}
+DEFAULT_PROVIDERS = 'coingecko,kraken,binance'
+
+
+def needs_symbols(names):
+    # exchanges quote symbol pairs, so anything past SYMBOLS needs the coin catalog loaded
+    return any(issubclass(PROVIDERS.get(name.strip().lower(), object), ExchangeProvider) for name in names.split(','))
+
+
+def create_fetcher(names=DEFAULT_PROVIDERS, strategy=FASTEST, symbol_lookup=None):
+    providers = []
+    for name in [name.strip().lower() for name in names.split(',') if name.strip()]:
+        if name not in PROVIDERS:
+            raise ValueError(f"unknown price provider '{name}', choose from {', '.join(PROVIDERS)}")
+        provider_class = PROVIDERS[name]
+        if issubclass(provider_class, ExchangeProvider):
+            providers.append(provider_class(symbol_lookup=symbol_lookup))
+        else:
+            providers.append(provider_class())
+    if len(providers) == 1:
+        return providers[0]
+    return MultiSourceFetcher(providers, strategy)
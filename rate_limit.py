@@ -0,0 +1,77 @@
+import random
+import threading
+import time
+
+RATE_LIMIT_PER_MINUTE = 30  # CoinGecko's published free tier limit
+BUDGET_SHARE = 0.8  # leave headroom for the odd manual refresh and clock skew
+BURST = 5
+BACKOFF_BASE = 5
+BACKOFF_CAP = 900
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute, capacity=BURST, clock=time.monotonic):
+        self.rate_per_minute = rate_per_minute
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.last = clock()
+        self.lock = threading.Lock()
+
+    def refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate_per_minute / 60.0)
+        self.last = now
+
+    def available(self):
+        with self.lock:
+            self.refill()
+            return self.tokens
+
+    def time_until(self, amount=1):
+        with self.lock:
+            self.refill()
+            missing = min(amount, self.capacity) - self.tokens
+            return max(missing, 0) * 60.0 / self.rate_per_minute
+
+    def try_take(self, amount=1):
+        with self.lock:
+            self.refill()
+            amount = min(amount, self.capacity)
+            if self.tokens < amount:
+                return False
+            self.tokens -= amount
+            return True
+
+    def drain(self):
+        with self.lock:
+            self.refill()
+            self.tokens = 0.0
+
+
+class Backoff:
+    def __init__(self, base=BACKOFF_BASE, cap=BACKOFF_CAP, clock=time.monotonic):
+        self.base = base
+        self.cap = cap
+        self.clock = clock
+        self.attempts = 0
+        self.until = 0.0
+
+    def next_delay(self, retry_after=None, limit=None):
+        # limit caps the wait itself, not just the caller's timer, so remaining() agrees with it
+        delay = min(self.cap, self.base * 2 ** self.attempts)
+        delay = random.uniform(delay / 2, delay)  # jitter so restarts don't retry in lockstep
+        if retry_after:
+            delay = max(delay, retry_after)
+        if limit is not None:
+            delay = min(delay, limit)
+        self.attempts += 1
+        self.until = self.clock() + delay
+        return delay
+
+    def remaining(self):
+        return max(self.until - self.clock(), 0.0)
+
+    def reset(self):
+        self.attempts = 0
+        self.until = 0.0
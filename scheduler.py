@@ -0,0 +1,105 @@
+import time
+from collections import deque
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from rate_limit import TokenBucket, Backoff, RATE_LIMIT_PER_MINUTE, BUDGET_SHARE
+
+COALESCE_MS = 400
+
+
+class RequestScheduler(QObject):
+    # decides when the next fetch may go out; the owner connects fire to its fetch
+    fire = pyqtSignal()
+    status_changed = pyqtSignal()
+
+    def __init__(self, interval, cost=None, rate_per_minute=RATE_LIMIT_PER_MINUTE, parent=None):
+        super().__init__(parent)
+        self.interval = interval
+        self.cost = cost or (lambda: 1)
+        self.rate_limit = rate_per_minute
+        self.bucket = TokenBucket(rate_per_minute * BUDGET_SHARE)
+        self.backoff = Backoff()
+        self.sent = deque()
+        self.in_flight = False
+        self.last_fire = 0.0
+        self.next_fire = 0.0
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.tick)
+        self.coalesce_timer = QTimer(self)
+        self.coalesce_timer.setSingleShot(True)
+        self.coalesce_timer.setInterval(COALESCE_MS)
+        self.coalesce_timer.timeout.connect(self.tick)
+
+    def start(self):
+        self.tick()
+
+    def request_now(self):
+        # restarting the timer collapses a burst of manual refreshes into one request
+        self.coalesce_timer.start()
+
+    def set_interval(self, seconds):
+        self.interval = seconds
+        if not self.in_flight and not self.backoff.attempts:
+            self.schedule(self.last_fire + self.effective_interval() - time.monotonic())
+
+    def effective_interval(self):
+        # the slider sets the pace, but a long watch list is stretched to fit the budget
+        budget_interval = 60.0 * max(self.cost(), 1) / self.bucket.rate_per_minute
+        return max(self.interval, budget_interval)
+
+    def schedule(self, delay):
+        delay = max(delay, 0.0)
+        self.next_fire = time.monotonic() + delay
+        self.timer.start(int(delay * 1000))
+        self.status_changed.emit()
+
+    def tick(self):
+        self.coalesce_timer.stop()
+        if self.backoff.remaining() > 0:
+            self.schedule(self.backoff.remaining())
+            return
+        cost = max(self.cost(), 1)
+        if not self.bucket.try_take(cost):
+            self.schedule(self.bucket.time_until(cost))
+            return
+        self.timer.stop()
+        now = time.monotonic()
+        self.last_fire = now
+        self.sent.extend([now] * cost)
+        self.in_flight = True
+        self.status_changed.emit()
+        self.fire.emit()
+
+    def on_success(self):
+        self.in_flight = False
+        self.backoff.reset()
+        self.schedule(self.effective_interval())
+
+    def on_failure(self):
+        # plain network errors retry sooner than the poll interval, but never later
+        self.in_flight = False
+        self.schedule(self.backoff.next_delay(limit=self.effective_interval()))
+
+    def on_rate_limited(self, retry_after=0.0):
+        self.bucket.drain()
+        self.in_flight = False
+        self.schedule(self.backoff.next_delay(retry_after or None))
+
+    def requests_last_minute(self):
+        cutoff = time.monotonic() - 60
+        while self.sent and self.sent[0] < cutoff:
+            self.sent.popleft()
+        return len(self.sent)
+
+    def status(self):
+        return {
+            'requests_per_minute': self.requests_last_minute(),
+            'rate_limit': self.rate_limit,
+            'budget': self.bucket.available(),
+            'capacity': self.bucket.capacity,
+            'interval': self.effective_interval(),
+            'next_fire': max(self.next_fire - time.monotonic(), 0.0),
+            'backoff': self.backoff.remaining(),
+            'attempts': self.backoff.attempts,
+        }
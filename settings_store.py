@@ -0,0 +1,112 @@
+import copy
+import json
+import os
+import threading
+from paths import config_dir
+from currency import BASE_CURRENCY, DEFAULT_CURRENCIES
+import metrics
+
+SCHEMA_VERSION = 1
+LEGACY_FAVORITES = 'favorite_tickers.json'  # older releases kept favorites in the working directory
+DEFAULTS = {
+    'favorites': {},
+    'ticker': 'bitcoin',
+    'interval': 60,
+    'currency': BASE_CURRENCY,  # the one prices are shown in
+    'currencies': DEFAULT_CURRENCIES,  # quoted with every request
+    'settings_position': None,
+    'floating_position': None,
+    'pinned_windows': [],  # [{'ticker', 'position', 'chart'}]
+    'strip_visible': False,
+    'strip_position': None,
+}
+
+
+def migrate(data):
+    # bring a settings file written by an older release up to SCHEMA_VERSION
+    if 'version' not in data:
+        data = {'version': 1, 'favorites': data}  # a bare favorite_tickers.json
+    return data
+
+
+class SettingsStore:
+    # settings.json under the XDG config dir; reads come from memory, and flush() writes
+    # the file atomically, so callers collapse bursts of edits by delaying the flush
+    def __init__(self, path=None, legacy_path=LEGACY_FAVORITES):
+        self.path = path or os.path.join(config_dir(), 'settings.json')
+        self.legacy_path = legacy_path
+        self.data = None
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def read(self, path):
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError("not a JSON object")
+        return data
+
+    def load(self):
+        if self.data is not None:
+            return self.data
+        started = metrics.start()
+        data = {}
+        try:
+            data = migrate(self.read(self.path))
+        except FileNotFoundError:
+            if self.legacy_path and os.path.exists(self.legacy_path):
+                try:
+                    data = migrate(self.read(self.legacy_path))
+                    self.dirty = True  # written to the new location on the next flush
+                    print(f"Imported favorites from {os.path.abspath(self.legacy_path)} into {self.path}")
+                except (OSError, ValueError) as e:
+                    print(f"Could not read {self.legacy_path}: {e}")
+                    metrics.error('settings', f"could not read {self.legacy_path}: {e}")
+        except (OSError, ValueError) as e:
+            # keep the unreadable file for inspection rather than overwriting it
+            print(f"Could not read settings from {self.path}: {e}")
+            metrics.error('settings', f"could not read {self.path}: {e}")
+            try:
+                os.replace(self.path, self.path + '.bad')
+            except OSError:
+                pass
+        if data.get('version', SCHEMA_VERSION) > SCHEMA_VERSION:
+            print(f"{self.path} was written by a newer CoinWatcher, unknown settings are kept as they are")
+        self.data = {'version': SCHEMA_VERSION, **copy.deepcopy(DEFAULTS), **data}
+        metrics.finish('settings.load', started)
+        return self.data
+
+    def get(self, key):
+        return self.load()[key]
+
+    def set(self, key, value):
+        self.load()[key] = value
+        self.dirty = True
+
+    def touch(self):
+        # for values that were changed in place, like the favorites dict
+        self.dirty = True
+
+    def flush(self):
+        if not self.dirty or self.data is None:
+            return
+        started = metrics.start()
+        with self.lock:
+            self.dirty = False
+            content = json.dumps(self.data, indent=4)  # keep it readable
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(temp_path, 'w') as f:
+                    f.write(content)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, self.path)
+            except OSError as e:
+                self.dirty = True
+                print(f"Could not save settings to {self.path}: {e}")
+                metrics.error('settings', f"could not save {self.path}: {e}")
+        metrics.finish('settings.flush', started)
+
+    def close(self):
+        self.flush()
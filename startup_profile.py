@@ -0,0 +1,28 @@
+import time
+
+enabled = False
+started = None
+marks = []
+
+
+def enable(start_time):
+    global enabled, started
+    enabled = True
+    started = start_time
+
+
+def mark(label):
+    if enabled:
+        marks.append((label, time.perf_counter()))
+
+
+def report():
+    if not enabled:
+        return
+    mark("event loop running")
+    print("Startup profile (ms):")
+    previous = started
+    for label, timestamp in marks:
+        print(f"  {(timestamp - previous) * 1000:8.1f}  {label}")
+        previous = timestamp
+    print(f"  {(previous - started) * 1000:8.1f}  total", flush=True)
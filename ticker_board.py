@@ -0,0 +1,149 @@
+from collections import OrderedDict
+from PyQt6.QtCore import QObject, QRectF, QSize, Qt, pyqtSignal
+from PyQt6.QtGui import QColor, QFont, QFontMetrics, QPainter, QPixmap
+
+FONT_PIXEL_SIZE = 16
+BACKGROUND_OPACITY = 0.8
+DEFAULT_BACKGROUND = QColor(75, 0, 130).name()
+DEFAULT_TEXT_COLOR = '#ffffff'
+CORNER_RADIUS = 10
+LABEL_PADDING = (10, 3)  # px around the text of a strip label
+SIZE_CACHE = 512  # texts whose size is remembered
+PIXMAP_CACHE = 64  # window backgrounds, by color and size
+
+
+class TickerStyle:
+    # built once per ticker and color change; windows compare these by identity
+    def __init__(self, background, text_color):
+        self.background = QColor(background)
+        self.background.setAlphaF(BACKGROUND_OPACITY)
+        self.text_color = QColor(text_color)
+        self.stylesheet = f"color: {self.text_color.name()};"
+
+
+def remember(cache, key, value, limit):
+    cache[key] = value
+    while len(cache) > limit:
+        cache.popitem(last=False)
+    return value
+
+
+class TickerBoard(QObject):
+    # the one feed behind every floating window and the ticker strip: a ticker's text, style
+    # and pixmaps are worked out once per change and shared by everything showing it
+    updated = pyqtSignal(object)  # the tickers that changed, or None for all of them
+
+    def __init__(self, table, format_text, format_total, colors, parent=None):
+        super().__init__(parent)
+        self.table = table
+        self.format_text = format_text  # ticker -> the lines shown for it
+        self.format_total = format_total  # () -> the portfolio line, or ""
+        self.colors = colors  # ticker -> (background, text color)
+        self.font = QFont()
+        self.font.setPixelSize(FONT_PIXEL_SIZE)
+        self.font_metrics = QFontMetrics(self.font)
+        self.texts = {}
+        self.total_text = None
+        self.styles = {}
+        self.sizes = OrderedDict()  # text -> QSize
+        self.backgrounds = OrderedDict()  # (rgba, width, height, device pixel ratio) -> QPixmap
+        self.labels = {}  # ticker -> (text, style, device pixel ratio, QPixmap) for the strip
+
+    def publish(self, tickers=None):
+        # prices or formatting changed; texts are made again the next time someone asks
+        if tickers is None:
+            self.texts.clear()
+        else:
+            tickers = set(tickers)
+            for ticker in tickers:
+                self.texts.pop(ticker, None)
+        self.total_text = None  # any held coin moves the portfolio total
+        self.updated.emit(tickers)
+
+    def restyle(self, tickers=None):
+        if tickers is None:
+            self.styles.clear()
+        else:
+            tickers = set(tickers)
+            for ticker in tickers:
+                self.styles.pop(ticker, None)
+        self.updated.emit(tickers)
+
+    def text(self, ticker):
+        text = self.texts.get(ticker)
+        if text is None:
+            text = self.texts[ticker] = self.format_text(ticker)
+        return text
+
+    def total(self):
+        if self.total_text is None:
+            self.total_text = self.format_total()
+        return self.total_text
+
+    def style(self, ticker):
+        style = self.styles.get(ticker)
+        if style is None:
+            style = self.styles[ticker] = TickerStyle(*self.colors(ticker))
+        return style
+
+    def sample(self, ticker):
+        # (timestamp, price) of the latest price, or None
+        if ticker not in self.table:
+            return None
+        return self.table.updated[ticker], self.table.get(ticker)
+
+    def text_size(self, text):
+        size = self.sizes.get(text)
+        if size is None:
+            lines = text.split('\n')
+            size = remember(self.sizes, text, QSize(max(self.font_metrics.horizontalAdvance(line) for line in lines),
+                                                    self.font_metrics.height() * len(lines)), SIZE_CACHE)
+        else:
+            self.sizes.move_to_end(text)
+        return size
+
+    def background(self, color, size, ratio=1.0):
+        key = (color.rgba(), size.width(), size.height(), ratio)
+        pixmap = self.backgrounds.get(key)
+        if pixmap is not None:
+            self.backgrounds.move_to_end(key)
+            return pixmap
+        pixmap = self.rounded_pixmap(color, size.width(), size.height(), ratio)
+        return remember(self.backgrounds, key, pixmap, PIXMAP_CACHE)
+
+    def rounded_pixmap(self, color, width, height, ratio):
+        pixmap = QPixmap(round(width * ratio), round(height * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setBrush(color)
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.drawRoundedRect(QRectF(0, 0, width, height), CORNER_RADIUS, CORNER_RADIUS)
+        painter.end()
+        return pixmap
+
+    def label_height(self):
+        return self.font_metrics.height() + 2 * LABEL_PADDING[1]
+
+    def label(self, ticker, ratio=1.0):
+        # the first line of a ticker's text drawn on its colors, for the strip to blit
+        text = self.text(ticker).split('\n', 1)[0]
+        style = self.style(ticker)
+        cached = self.labels.get(ticker)
+        if cached and cached[0] == text and cached[1] is style and cached[2] == ratio:
+            return cached[3]
+        width = self.font_metrics.horizontalAdvance(text) + 2 * LABEL_PADDING[0]
+        pixmap = self.rounded_pixmap(style.background, width, self.label_height(), ratio)
+        painter = QPainter(pixmap)
+        painter.setFont(self.font)
+        painter.setPen(style.text_color)
+        painter.drawText(QRectF(0, 0, width, self.label_height()), Qt.AlignmentFlag.AlignCenter, text)
+        painter.end()
+        self.labels[ticker] = (text, style, ratio, pixmap)
+        return pixmap
+
+    def forget(self, tickers):
+        # tickers nothing shows any more
+        for ticker in tickers:
+            self.labels.pop(ticker, None)
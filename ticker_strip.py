@@ -0,0 +1,129 @@
+import time
+from PyQt6.QtWidgets import QWidget, QMenu
+from PyQt6.QtGui import QPainter
+from PyQt6.QtCore import Qt, QPoint, QTimer, pyqtSignal
+import metrics
+
+STRIP_WIDTH = 720
+LABEL_GAP = 12
+SCROLL_MS = 33  # ~30 frames a second
+SCROLL_SPEED = 40  # px per second
+
+
+class TickerStrip(QWidget):
+    # a horizontal crawl of one label per ticker; labels are pixmaps from the board, so a
+    # frame only blits them and a price change only redraws that one ticker's label
+    moved = pyqtSignal(QPoint)
+    close_requested = pyqtSignal()
+
+    def __init__(self, board, tickers=(), parent=None):
+        super().__init__(parent)
+        self.setWindowFlags(Qt.WindowType.FramelessWindowHint | Qt.WindowType.WindowStaysOnTopHint | Qt.WindowType.Tool)
+        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
+        self.setWindowTitle("CoinWatcher Ticker Strip")
+        self.board = board
+        self.tickers = []
+        self.labels = []  # (ticker, pixmap), rebuilt after an update touching one of them
+        self.labels_stale = True
+        self.content_width = 0
+        self.offset = 0.0
+        self.last_step = None
+        self.paused = False
+        self.setFixedSize(STRIP_WIDTH, board.label_height())
+
+        self.dragging = False
+        self.drag_offset = QPoint()
+
+        self.scroll_timer = QTimer(self)
+        self.scroll_timer.setInterval(SCROLL_MS)
+        self.scroll_timer.timeout.connect(self.step)
+        board.updated.connect(self.refresh)
+        self.set_tickers(tickers)
+
+    def set_tickers(self, tickers):
+        tickers = list(dict.fromkeys(tickers))
+        self.board.forget(set(self.tickers) - set(tickers))
+        self.tickers = tickers
+        self.refresh()
+
+    def refresh(self, tickers=None):
+        if tickers is None or not tickers.isdisjoint(self.tickers):
+            self.labels_stale = True
+            self.update()
+
+    def build_labels(self):
+        ratio = self.devicePixelRatioF()
+        self.labels = [(ticker, self.board.label(ticker, ratio)) for ticker in self.tickers]
+        self.content_width = sum(pixmap.deviceIndependentSize().width() + LABEL_GAP for _, pixmap in self.labels)
+        self.labels_stale = False
+        if self.content_width > self.width():
+            if self.isVisible() and not self.scroll_timer.isActive():
+                self.start_scrolling()
+        else:
+            self.scroll_timer.stop()
+            self.offset = 0.0
+
+    def start_scrolling(self):
+        self.last_step = time.monotonic()
+        self.scroll_timer.start()
+
+    def step(self):
+        now = time.monotonic()
+        if not self.paused and self.content_width:
+            self.offset = (self.offset + SCROLL_SPEED * (now - self.last_step)) % self.content_width
+            self.update()
+        self.last_step = now
+
+    @metrics.timed('strip.paint')
+    def paintEvent(self, event):
+        if self.labels_stale:
+            self.build_labels()
+        if not self.labels:
+            return
+        painter = QPainter(self)
+        # the row is drawn again right after itself, so the crawl wraps around seamlessly
+        x = -self.offset
+        while x < self.width():
+            for _, pixmap in self.labels:
+                width = pixmap.deviceIndependentSize().width()
+                if x + width > 0:
+                    painter.drawPixmap(QPoint(round(x), 0), pixmap)
+                x += width + LABEL_GAP
+                if x >= self.width():
+                    break
+            if self.content_width <= self.width():
+                break
+
+    def showEvent(self, event):
+        self.labels_stale = True
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.scroll_timer.stop()
+        super().hideEvent(event)
+
+    def enterEvent(self, event):
+        self.paused = True  # hold still while the mouse is over it
+
+    def leaveEvent(self, event):
+        self.paused = False
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            self.dragging = True
+            self.drag_offset = event.position().toPoint()
+
+    def mouseMoveEvent(self, event):
+        if self.dragging:
+            self.move(self.mapToGlobal(event.position().toPoint()) - self.drag_offset)
+
+    def mouseReleaseEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            if self.dragging:
+                self.moved.emit(self.pos())
+            self.dragging = False
+
+    def contextMenuEvent(self, event):
+        menu = QMenu(self)
+        menu.addAction("Hide Ticker Strip").triggered.connect(self.close_requested.emit)
+        menu.exec(event.globalPos())